@@ -1,17 +1,20 @@
 import asyncio
 
-import aiohttp
 import uvloop
 from utils import Bot
 
 
 async def startup():
     """
-    Constructs the bot and then runs ``start``, so that a clientsession can be shared.
+    Constructs the bot and then runs ``start``, so that its connection pools are created inside the loop.
     """
-    async with aiohttp.ClientSession() as cs:
-        bot = Bot(cs)
+    bot = Bot()
+
+    try:
         await bot.start(bot.config["bot"]["keys"]["token"])
+    finally:
+        if not bot.is_closed():
+            await bot.close()
 
 
 if __name__ == "__main__":
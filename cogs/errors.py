@@ -4,7 +4,7 @@ import logging
 
 import discord
 from discord.ext import commands
-from utils import Embed, CharacterNotFound
+from utils import Embed, CardApiError
 
 
 class Errors(commands.Cog):
@@ -12,7 +12,8 @@ class Errors(commands.Cog):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
         self.ignored = (commands.CommandNotFound,)
-        self.handle = (CharacterNotFound,)
+        # card api failures, e.g. an open circuit or a timeout, are expected rather than bugs.
+        self.handle = (CardApiError,)
 
     @commands.Cog.listener()
     async def on_command_error(
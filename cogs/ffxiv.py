@@ -1,32 +1,58 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import json
+import logging
+import os
+import random
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import List, Dict, Any, Optional
+    from typing import (
+        List,
+        Dict,
+        Any,
+        AsyncIterator,
+        Hashable,
+        Optional,
+        Tuple,
+        Union,
+    )
 
     from utils import Bot
 
+import aiohttp
 import discord
 import pyxivapi
 from discord.ext import commands, menus
 from discord.ext.menus.views import ViewMenuPages
-from utils import Embed, FormatList, Context, Timer, XIVCharacterCardsClient
-
-
-class FormatCharacterResponse(menus.ListPageSource):
+from utils import (
+    CardApiError,
+    Embed,
+    ImageCache,
+    StreamPageSource,
+    FormatList,
+    Context,
+    Timer,
+    TTLCache,
+    SearchIndex,
+    XIVCharacterCardsClient,
+)
+
+XIVAPI_URL = "https://xivapi.com"
+
+
+class FormatCharacterResponse(StreamPageSource):
     def __init__(
         self,
         entries,
     ):
         super().__init__(entries, per_page=1)
 
-    async def format_page(self, menu: ViewMenuPages, entry: Dict[str, Any]):
+    async def render_page(self, menu: ViewMenuPages, entry: Dict[str, Any]):
         embed = Embed(title=f"{entry['Name']}")
 
-        if self.get_max_pages() > 1:
-            embed.set_footer(text=f"Page {menu.current_page+1}/{self.get_max_pages()}")
-
         embed.set_thumbnail(url=entry["Avatar"])
 
         embed.add_field(
@@ -43,9 +69,94 @@ class FormatCharacterResponse(menus.ListPageSource):
         return embed
 
 
+async def _singles(items: AsyncIterator[Any]) -> AsyncIterator[List[Any]]:
+    async for item in items:
+        yield [item]
+
+
+class FormatCards(StreamPageSource):
+    """One character card per page, or why it couldn't be made.
+    Takes the stream from :meth:`XIVCharacterCardsClient.prepare_ids` or ``prepare_names``.
+    """
+
+    def __init__(self, cards):
+        super().__init__(_singles(cards), per_page=1)
+
+    async def render_page(
+        self,
+        menu: ViewMenuPages,
+        entry: Tuple[Union[int, str], Union[Dict[str, Any], CardApiError]],
+    ):
+        label, res = entry
+        embed = Embed(title=str(label))
+
+        if isinstance(res, CardApiError):
+            embed.description = f"```diff\n- {res.reason}```"
+        else:
+            embed.set_image(url=res["url"])
+
+        return embed
+
+
+class WorldTopology:
+    """Which worlds belong to which datacenter, as reported by XIVAPI's ``/servers/dc``.
+
+    Names are resolved case insensitively through a prebuilt map, and misspelled names
+    are matched against a :class:`SearchIndex` of every name. A topology is never
+    changed once built, a refresh builds a new one and swaps it in.
+    """
+
+    __slots__ = ("datacenters", "worlds", "names", "_lookup", "_search")
+
+    def __init__(self, datacenters: Dict[str, List[str]]) -> None:
+        self.datacenters = datacenters
+        self.worlds: Dict[str, str] = {
+            world: datacenter
+            for datacenter, worlds in datacenters.items()
+            for world in worlds
+        }
+        # every world, followed by every datacenter.
+        self.names: List[str] = [*self.worlds, *self.datacenters]
+        self._lookup = {name.casefold(): name for name in self.names}
+        self._search: SearchIndex[str] = SearchIndex()
+
+        for name in self.names:
+            self._search.add(name, (name, 1))
+
+    @classmethod
+    def parse(cls, data: Any) -> WorldTopology:
+        """Builds a topology from a mapping of datacenters to their worlds' names.
+
+        Raises:
+            ValueError: ``data`` isn't such a mapping.
+        """
+        if not (
+            isinstance(data, dict)
+            and data
+            and all(
+                isinstance(worlds, list) and all(isinstance(w, str) for w in worlds)
+                for worlds in data.values()
+            )
+        ):
+            raise ValueError("not a mapping of datacenters to worlds")
+
+        return cls(data)
+
+    def is_datacenter(self, name: str) -> bool:
+        return name in self.datacenters
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Returns the properly cased world or datacenter called ``name``, if there is one."""
+        return self._lookup.get(name.casefold())
+
+    def suggest(self, name: str, *, limit: int = 3) -> List[str]:
+        """Returns the worlds and datacenters closest to ``name``, e.g. for typos or autocomplete."""
+        return [match for match, _ in self._search.search(name, limit=limit)]
+
+
 class ServerConverter(commands.Converter):
-    """A converter for getting a valid server.
-    This just casts the arg to titlecase then checks if the arg is in the list.
+    """A converter for getting a valid world or datacenter, case insensitively.
+    Waits for the server list if it's still being loaded.
     """
 
     value: str
@@ -58,18 +169,20 @@ class ServerConverter(commands.Converter):
                 "The FFXIV cog is currently not loaded, please try again later."
             )
 
-        servers = ffxiv.servers
-        raw_datacenters = ffxiv.raw_datacenters
-        datacenters = ffxiv.datacenters
+        topology = await ffxiv.wait_for_topology()
+        server = topology.resolve(arg)
 
-        if arg in raw_datacenters:
-            arg = f"_dc_{arg}"
+        if server is not None:
+            self.value = server
+            return server
 
-        if arg in servers or arg in datacenters:
-            self.value = arg
-            return arg
+        suggestions = topology.suggest(arg)
+        message = "The given server is not valid."
 
-        raise commands.BadArgument("The given server is not valid.")
+        if suggestions:
+            message += f" Did you mean {', '.join(suggestions)}?"
+
+        raise commands.BadArgument(message)
 
 
 class ApiError(commands.CommandError):
@@ -86,38 +199,360 @@ class Ffxiv(commands.Cog):
     """
 
     servers: List[str]
+    topology: WorldTopology
+    topology_timeout = 10
+    bulk_limit = 50
 
     def __init__(self, bot: Bot):
         self.bot = bot
-        self.datacenters = [
-            "_dc_Elemental",
-            "_dc_Gaia",
-            "_dc_Mana",
-            "_dc_Aether",
-            "_dc_Primal",
-            "_dc_Crystal",
-            "_dc_Chaos",
-            "_dc_Light",
-        ]
-        self.raw_datacenters = [
-            "Elemental",
-            "Gaia",
-            "Mana",
-            "Aether",
-            "Primal",
-            "Crystal",
-            "Chaos",
-            "Light",
-        ]
-        self.client = pyxivapi.XIVAPIClient(
-            self.bot.config["bot"]["keys"]["ffxiv_key"], self.bot.session
+        self.logger = logging.getLogger(__name__)
+        self.api_key = self.bot.config["bot"]["keys"]["ffxiv_key"]
+        self.session = self.bot.pools.session("xivapi")
+        self.client = pyxivapi.XIVAPIClient(self.api_key, self.session)
+        ffxiv_config = self.bot.config["bot"].get("ffxiv", {})
+        self.search_concurrency: int = ffxiv_config.get("search_concurrency", 4)
+        self.refresh_interval: float = ffxiv_config.get("refresh_interval", 21600)
+        self.refresh_jitter: float = ffxiv_config.get("refresh_jitter", 0.1)
+        self.snapshot_path: Optional[str] = ffxiv_config.get(
+            "snapshot_path", "ffxiv_servers.json"
+        )
+        self.topology_ready = asyncio.Event()
+        # validators of the current topology, for conditional requests.
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        cache_config = self.bot.config["bot"].get("cache", {})
+        self.card_client = XIVCharacterCardsClient(
+            bot.pools.session("cards"),
+            cache_ttl=cache_config.get("card_ttl", 3600),
+            cache_size=cache_config.get("card_size", 512),
+            cache_stale_ttl=cache_config.get("card_stale_ttl", 86400),
+            store=bot.store,
+            limiter=bot.ratelimits.get("cards"),
+            max_concurrency=ffxiv_config.get("card_concurrency", 4),
+            timeouts=ffxiv_config.get("card_timeouts"),
+            hedge=ffxiv_config.get("card_hedging", False),
+            **ffxiv_config.get("card_breaker", {}),
+        )
+        self.xivapi_limiter = bot.ratelimits.get("xivapi")
+        self.search_cache: TTLCache[Any, Dict[str, Any]] = TTLCache(
+            ttl=cache_config.get("search_ttl", 3600),
+            maxsize=cache_config.get("search_size", 256),
+            store=bot.store,
+            namespace="search",
+            stale_ttl=cache_config.get("search_stale_ttl", 3600),
+        )
+        self.image_cache = ImageCache(
+            cache_config.get("image_path", "card_images"),
+            max_bytes=cache_config.get("image_max_bytes", 100_000_000),
+        )
+        # card url -> digest of the downloaded image, and the discord cdn url it was uploaded to.
+        self.card_images: TTLCache[str, Dict[str, str]] = TTLCache(
+            ttl=cache_config.get("card_ttl", 3600),
+            maxsize=cache_config.get("card_size", 512),
+            store=bot.store,
+            namespace="card_images",
+        )
+        self.bot.caches["cards"] = self.card_client.cache
+        self.bot.caches["card_images"] = self.card_images
+        self.bot.caches["search"] = self.search_cache
+        self.bot.breakers["cards"] = self.card_client.breaker
+        self.bot.hedges["cards"] = self.card_client.hedges
+        self.watchlist: List[int] = ffxiv_config.get("watchlist", [])
+        self.watchlist_interval: float = ffxiv_config.get("watchlist_interval", 600)
+        self.refresher = self.bot.loop.create_task(self.refresh_servers())
+        self.prefetcher = self.bot.loop.create_task(self.prefetch_watchlist())
+
+    def cog_unload(self):
+        self.refresher.cancel()
+        self.prefetcher.cancel()
+        self.image_cache.close()
+        self.bot.caches.pop("cards", None)
+        self.bot.caches.pop("card_images", None)
+        self.bot.caches.pop("search", None)
+        self.bot.breakers.pop("cards", None)
+        self.bot.hedges.pop("cards", None)
+
+    async def character_search(
+        self,
+        server: str,
+        first: str,
+        last: str,
+        *,
+        page: int = 1,
+        key: Hashable = None,
+    ) -> Dict[str, Any]:
+        """Searches XIVAPI for a character, caching each page of results.
+        Requests go through the xivapi rate limiter, queued fairly by ``key``."""
+
+        async def fetch() -> Dict[str, Any]:
+            await self.xivapi_limiter.acquire(key)
+            return await self.client.character_search(server, first, last, page=page)  # type: ignore
+
+        return await self.search_cache.get_or_fetch(
+            ("character", server.casefold(), first.casefold(), last.casefold(), page),
+            fetch,
         )
-        self.card_client = XIVCharacterCardsClient(bot.session)
-        self.bot.loop.create_task(self.get_server_data())
+
+    async def iter_character_search(
+        self, server: str, first: str, last: str, *, key: Hashable = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields every page of results of a character search.
+
+        The next page is requested as soon as one is yielded, so it's usually
+        ready by the time the paginator gets to it.
+        """
+        page = await self.character_search(server, first, last, key=key)
+        upcoming: Optional[asyncio.Future[Dict[str, Any]]] = None
+
+        try:
+            while True:
+                next_page = page["Pagination"]["PageNext"]
+
+                if next_page:
+                    upcoming = asyncio.ensure_future(
+                        self.character_search(
+                            server, first, last, page=next_page, key=key
+                        )
+                    )
+
+                yield page["Results"]
+
+                if upcoming is None:
+                    return
+
+                page, upcoming = await upcoming, None
+        finally:
+            # the paginator stopped early, the fetch itself still finishes into the cache.
+            if upcoming is not None:
+                upcoming.cancel()
+
+    async def iter_datacenter_search(
+        self, datacenter: str, first: str, last: str, *, key: Hashable = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Searches every world of a datacenter at once, yielding results as each world answers.
+
+        At most ``search_concurrency`` requests are in flight, and characters are only
+        yielded once even if several worlds return them. A world that fails is skipped
+        unless every world fails.
+        """
+        worlds = self.topology.datacenters[datacenter]
+        semaphore = asyncio.Semaphore(self.search_concurrency)
+        # bounded, so worlds stop paging while nobody is reading their results.
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.search_concurrency)
+
+        async def search_world(world: str) -> None:
+            page = 1
+
+            try:
+                while page:
+                    async with semaphore:
+                        res = await self.character_search(
+                            world, first, last, page=page, key=key
+                        )
+
+                    await queue.put(res["Results"])
+                    page = res["Pagination"]["PageNext"]
+            except Exception as e:
+                await queue.put(e)
+
+            await queue.put(None)
+
+        tasks = [asyncio.ensure_future(search_world(world)) for world in worlds]
+        remaining = len(tasks)
+        errors: List[Exception] = []
+        seen = set()
+
+        try:
+            while remaining:
+                item = await queue.get()
+
+                if item is None:
+                    remaining -= 1
+                    continue
+
+                if isinstance(item, Exception):
+                    self.logger.warning(
+                        "searching a world of %s failed", datacenter, exc_info=item
+                    )
+                    errors.append(item)
+                    continue
+
+                fresh = [c for c in item if c["ID"] not in seen]
+                seen.update(c["ID"] for c in fresh)
+
+                if fresh:
+                    yield fresh
+
+            if errors and len(errors) == len(worlds):
+                raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_topology(self) -> Optional[WorldTopology]:
+        """Gets every datacenter and its worlds from XIVAPI.
+
+        Returns:
+            Optional[WorldTopology]: The topology, or ``None`` if it didn't change since the last fetch.
+        """
+        headers = {}
+
+        if self._etag is not None:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified is not None:
+            headers["If-Modified-Since"] = self._last_modified
+
+        await self.xivapi_limiter.acquire()
+
+        async with self.session.get(
+            f"{XIVAPI_URL}/servers/dc",
+            params={"private_key": self.api_key},
+            headers=headers,
+        ) as resp:
+            if resp.status == 304:
+                return None
+
+            if resp.status != 200:
+                raise ApiError("Fetching datacenters failed", await resp.text())
+
+            topology = WorldTopology.parse(await resp.json())
+            # only once it's parsed, or a broken response would be answered with 304s from now on.
+            self._etag = resp.headers.get("ETag")
+            self._last_modified = resp.headers.get("Last-Modified")
+            return topology
+
+    def set_topology(self, topology: WorldTopology) -> None:
+        self.topology = topology
+        self.servers = list(topology.worlds)
+        self.topology_ready.set()
 
     async def get_server_data(self):
-        """Gets a list of valid FFXIV servers for use in the server converter."""
-        self.servers = await self.client.get_server_list()
+        """Gets the valid FFXIV worlds and datacenters for use in the server converter,
+        snapshotting them to disk when they changed."""
+        topology = await self.fetch_topology()
+
+        if topology is None:
+            return
+
+        self.set_topology(topology)
+
+        if self.snapshot_path is not None:
+            snapshot = {
+                "datacenters": topology.datacenters,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+            }
+            await self.bot.loop.run_in_executor(
+                None, self._write_snapshot, self.snapshot_path, snapshot
+            )
+
+    @staticmethod
+    def _write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+
+        # replaced in one go, so a crash mid-write never leaves a broken snapshot.
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def _read_snapshot(path: str) -> Optional[Tuple[WorldTopology, Dict[str, Any]]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if not isinstance(snapshot, dict) or not all(
+            isinstance(snapshot.get(key), (str, type(None)))
+            for key in ("etag", "last_modified")
+        ):
+            raise ValueError(f"{path} isn't a server list snapshot")
+
+        return WorldTopology.parse(snapshot.get("datacenters")), snapshot
+
+    async def load_snapshot(self) -> None:
+        """Serves the last saved topology until it's refreshed."""
+        if self.snapshot_path is None:
+            return
+
+        try:
+            loaded = await self.bot.loop.run_in_executor(
+                None, self._read_snapshot, self.snapshot_path
+            )
+        except (OSError, ValueError):
+            self.logger.warning("couldn't read the server list snapshot", exc_info=True)
+            return
+
+        if loaded is None:
+            return
+
+        topology, snapshot = loaded
+        self._etag = snapshot.get("etag")
+        self._last_modified = snapshot.get("last_modified")
+        self.set_topology(topology)
+
+    async def refresh_servers(self) -> None:
+        """Loads the snapshot, then refreshes the topology every ``refresh_interval`` seconds
+        (give or take ``refresh_jitter``). Failed refreshes are retried with exponential backoff.
+        """
+        await self.load_snapshot()
+        failures = 0
+
+        while True:
+            try:
+                await self.get_server_data()
+            except Exception:
+                failures += 1
+                delay = min(5 * 2**failures, self.refresh_interval)
+                self.logger.warning(
+                    "refreshing the server list failed, retrying in %ds",
+                    delay,
+                    exc_info=True,
+                )
+            else:
+                failures = 0
+                delay = self.refresh_interval
+
+            jitter = self.refresh_jitter
+            await asyncio.sleep(delay * random.uniform(1 - jitter, 1 + jitter))
+
+    async def wait_for_topology(self) -> WorldTopology:
+        """Returns the current topology, waiting for it to be loaded if it isn't yet.
+
+        Raises:
+            commands.BadArgument: It wasn't loaded within ``topology_timeout`` seconds.
+        """
+        try:
+            await asyncio.wait_for(self.topology_ready.wait(), self.topology_timeout)
+        except asyncio.TimeoutError:
+            raise commands.BadArgument(
+                "The server list is still loading, please try again later."
+            ) from None
+
+        return self.topology
+
+    async def prefetch_watchlist(self) -> None:
+        """Keeps the cards of the characters in ``[bot.ffxiv].watchlist`` cached.
+
+        Every ``watchlist_interval`` seconds, cards that would expire before the next round are
+        prepared again. Requests are only made while the card api isn't used for anything else.
+        """
+        while True:
+            for id in self.watchlist:
+                while not self.card_client.idle:
+                    await asyncio.sleep(1)
+
+                try:
+                    await self.card_client.warm_id(
+                        id, margin=self.watchlist_interval, key="watchlist"
+                    )
+                except Exception:
+                    # e.g. a malformed response, which mustn't stop the other prefetches.
+                    self.logger.warning(
+                        "prefetching the card of %d failed", id, exc_info=True
+                    )
+
+            await asyncio.sleep(self.watchlist_interval)
 
     @commands.group()
     async def ffxiv(self, ctx):
@@ -130,7 +565,6 @@ class Ffxiv(commands.Cog):
         Powered by XIVApi"""
         pass
 
-    @commands.cooldown(1, 5, commands.BucketType.guild)
     @search.command()
     async def name(
         self,
@@ -141,25 +575,29 @@ class Ffxiv(commands.Cog):
     ):
         """
         Search for a player in a given server. Any of the datacenter's servers are valid.
-        This will only display up to 50 users.
-        You can also use a datacenter.
+        You can also use a datacenter, which searches all of its servers.
+        More results are loaded as you go through the pages.
 
         Use ``ffxiv ls`` to list all valid servers.
 
-        This also has a server-wide cooldown so I don't get banned from the api :P
-
-        NOTE:
-            The datacenter / server is case sensitive.
+        Requests are rate limited globally so I don't get banned from the api :P
         """
-        res = await self.client.character_search(server, first, last)  # type: ignore
+        key = ctx.guild and ctx.guild.id
 
-        await ViewMenuPages(FormatCharacterResponse(res["Results"])).start(ctx)
+        if self.topology.is_datacenter(server):  # type: ignore
+            results = self.iter_datacenter_search(server, first, last, key=key)  # type: ignore
+        else:
+            results = self.iter_character_search(server, first, last, key=key)  # type: ignore
+
+        await ViewMenuPages(FormatCharacterResponse(results)).start(ctx)
 
     @ffxiv.command(aliases=["ls"])
     async def list_servers(self, ctx: commands.Context):
         """Lists the valid servers in an interactive pagination session."""
+        topology = await self.wait_for_topology()
+
         await ViewMenuPages(
-            FormatList(self.servers + self.raw_datacenters, per_page=10, enumerate=True)
+            FormatList(topology.names, per_page=10, enumerate=True)
         ).start(ctx)
 
     @ffxiv.group()
@@ -169,29 +607,116 @@ class Ffxiv(commands.Cog):
         Powered by https://github.com/ArcaneDisgea/XIV-Character-Cards"""
         pass
 
+    async def send_card(
+        self, ctx: commands.Context, res: Dict[str, Any], content: str
+    ) -> None:
+        """Sends a prepared card, from Discord's CDN if it was uploaded before,
+        or uploaded from the image cache otherwise.
+
+        If the card can't be downloaded, the embed links to the card API instead."""
+        url = res["url"]
+
+        try:
+            cached = await self.card_images.get_or_fetch(
+                url, lambda: self.fetch_card(url)
+            )
+        except (CardApiError, aiohttp.ClientError):
+            # not cached, so the next lookup tries downloading it again.
+            self.logger.warning("downloading card %s failed", url, exc_info=True)
+            cached = {}
+
+        if "cdn" in cached:
+            await ctx.send(content, embed=Embed().set_image(url=cached["cdn"]))
+            return
+
+        data = None
+
+        if "digest" in cached:
+            data = await self.image_cache.get(cached["digest"])
+
+        if data is None:
+            await ctx.send(content, embed=Embed().set_image(url=url))
+            # the image was evicted, or never downloaded.
+            self.card_images.invalidate(url)
+            return
+
+        message = await ctx.send(
+            content,
+            embed=Embed().set_image(url="attachment://card.png"),
+            file=discord.File(io.BytesIO(data), filename="card.png"),
+        )
+
+        if message.attachments:
+            self.card_images.set(url, {**cached, "cdn": message.attachments[0].url})
+
+    async def fetch_card(self, url: str) -> Dict[str, str]:
+        """Downloads a card into the image cache.
+
+        Raises:
+            CardApiError: The card couldn't be downloaded.
+            aiohttp.ClientError: The card couldn't be downloaded.
+        """
+        data = await self.card_client.download(url)
+        return {"digest": await self.image_cache.put(data)}
+
     @whois.command(name="name")
     async def whois_name(self, ctx: commands.Context, world: str, *, name: str):
         """Gets a character card via a name & world."""
         async with ctx.typing():
-            with Timer() as timer:
-                res = await self.card_client.prepare_name(world, name)
+            with Timer("cards prepare_name", world=world, name=name) as timer:
+                res = await self.card_client.prepare_name(
+                    world, name, key=ctx.guild and ctx.guild.id
+                )
 
-        url = res["url"]
-        await ctx.send(
-            f"Finished in {timer.elapsed} seconds.", embed=Embed().set_image(url=url)
-        )
+            await self.send_card(ctx, res, f"Finished in {timer.elapsed:.2f} seconds.")
 
     @whois.command(name="id")
     async def whois_id(self, ctx: commands.Context, id: int):
         """Gets a character card via a loadstone id."""
         async with ctx.typing():
-            with Timer() as timer:
-                res = await self.card_client.prepare_id(id)
+            with Timer("cards prepare_id", id=id) as timer:
+                res = await self.card_client.prepare_id(
+                    id, key=ctx.guild and ctx.guild.id
+                )
 
-        url = res["url"]
-        await ctx.send(
-            f"Finished in {timer.elapsed} seconds.", embed=Embed().set_image(url=url)
-        )
+            await self.send_card(ctx, res, f"Finished in {timer.elapsed:.2f} seconds.")
+
+    def check_bulk(self, count: int) -> None:
+        if not count:
+            raise commands.BadArgument("Give me at least one character to look up.")
+
+        if count > self.bulk_limit:
+            raise commands.BadArgument(
+                f"You can look up at most {self.bulk_limit} characters at once."
+            )
+
+    @whois.group(name="bulk", invoke_without_command=True)
+    async def whois_bulk(self, ctx: commands.Context, *ids: int):
+        """Gets the character cards of many loadstone ids at once.
+        Cards show up as they finish, in the order they finish in."""
+        self.check_bulk(len(set(ids)))
+
+        await ViewMenuPages(
+            FormatCards(
+                self.card_client.prepare_ids(ids, key=ctx.guild and ctx.guild.id)
+            )
+        ).start(ctx)
+
+    @whois_bulk.command(name="name")
+    async def whois_bulk_name(self, ctx: commands.Context, world: str, *, names: str):
+        """Gets the character cards of many characters on a world at once.
+        Separate the names with commas or new lines."""
+        characters = [n.strip() for n in names.replace("\n", ",").split(",")]
+        characters = [n for n in characters if n]
+        self.check_bulk(len(characters))
+
+        await ViewMenuPages(
+            FormatCards(
+                self.card_client.prepare_names(
+                    world, characters, key=ctx.guild and ctx.guild.id
+                )
+            )
+        ).start(ctx)
 
 
 def setup(bot):
@@ -1,18 +1,37 @@
+from __future__ import annotations
+
 import time
-from collections import Counter
+from typing import TYPE_CHECKING
 
 import discord
 from discord.ext import commands, menus
 from discord.ext.menus.views import ViewMenuPages
 
-from utils import FormatList, Context, Embed
+from utils import FormatList, Context, Embed, EventRates
+
+if TYPE_CHECKING:
+    from utils import LogLinearHistogram
+
+
+def format_latency(histogram: LogLinearHistogram) -> str:
+    p50, p95 = histogram.percentiles(50, 95)
+    return " | ".join(
+        f"{label} {value / 1e6:,.0f}ms"
+        for label, value in (
+            ("min", histogram.min),
+            ("p50", p50),
+            ("p95", p95),
+            ("max", histogram.max),
+        )
+    )
 
 
 class Meta(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        if not hasattr(self.bot, "socket_stats"):
-            self.bot.socket_stats = Counter()
+        if not isinstance(getattr(self.bot, "socket_stats", None), EventRates):
+            self.bot.socket_stats = EventRates()
+        self.bot.socket_stats.start()
 
     @commands.Cog.listener("on_socket_event_type")
     async def count_event_dispatches(self, event: str):
@@ -21,17 +40,19 @@ class Meta(commands.Cog):
         Args:
             event (str): The event name dispatched
         """
-        self.bot.socket_stats[event] += 1
+        self.bot.socket_stats.hit(event)
 
     @commands.command(aliases=["ss", "socketstats"])
     async def socket_stats(self, ctx: Context):
+        """Shows how many of each gateway event were received, and their rates over the last 1m/15m/1h."""
+        stats: EventRates = self.bot.socket_stats
+
         await ViewMenuPages(
             FormatList(
                 [
-                    f"{e}: {v}"
-                    for e, v in sorted(
-                        self.bot.socket_stats.items(), key=lambda x: x[1], reverse=True
-                    )
+                    f"**{e}**: {c.total:,} "
+                    f"({stats.rate(e, 60):.2f} / {stats.rate(e, 900):.2f} / {stats.rate(e, 3600):.2f} per sec)"
+                    for e, c in sorted(stats, key=lambda x: x[1].total, reverse=True)
                 ],
                 per_page=10,
             )
@@ -39,6 +60,8 @@ class Meta(commands.Cog):
 
     @commands.command()
     async def ping(self, ctx: Context):
+        """Shows the current latency, and percentiles over the last few minutes
+        for the gateway, discord's api, the event loop and the upstream apis."""
         embed = discord.Embed(title="Pong!")
 
         embed.add_field(
@@ -51,6 +74,27 @@ class Meta(commands.Cog):
         elapsed = round((end - start) * 1000)
 
         embed.add_field(name="API Latency", value=f"``{elapsed:,}ms``", inline=False)
+
+        bot = ctx.bot
+        minutes = f"{bot.rest_latency.window / 60:.0f}m"
+        windows = [
+            ("WS", bot.gateway_latency.snapshot()),
+            ("API", bot.rest_latency.snapshot()),
+            ("Loop Lag", bot.watchdog.lag.snapshot()),
+        ]
+        for host, name in bot.ratelimits.hosts.items():
+            recent = bot.http_metrics.recent.get(host)
+            if recent is not None:
+                windows.append((name, recent.snapshot()))
+
+        for name, histogram in windows:
+            if histogram.count:
+                embed.add_field(
+                    name=f"{name} ({minutes}, {histogram.count:,} samples)",
+                    value=f"``{format_latency(histogram)}``",
+                    inline=False,
+                )
+
         await msg.edit(embed=embed)
 
     @commands.command(aliases=["src"])
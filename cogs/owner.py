@@ -1,10 +1,17 @@
+from __future__ import annotations
+
 import traceback
+from typing import Optional
 
 import discord
 from discord.ext import commands, menus
 from discord.ext.menus.views import ViewMenuPages
 
-from utils import Codeblock, FormatList, Context
+from utils import Codeblock, FormatList, Context, CommandTimings, HttpPool, tracer
+
+
+def format_ns(value: int) -> str:
+    return f"{value / 1e6:,.1f}ms"
 
 
 class Owner(commands.Cog):
@@ -42,6 +49,134 @@ class Owner(commands.Cog):
         else:
             await ctx.send(f"reloaded extension ``extension``.")
 
+    @dev.command(name="caches")
+    async def caches(self, ctx: Context):
+        """Shows the hit / miss counters of the bot's caches."""
+        await ViewMenuPages(
+            FormatList(
+                [
+                    f"**{name}** ({len(cache)}/{cache.maxsize}): "
+                    f"{cache.stats.hits} hits, {cache.stats.misses} misses, "
+                    f"{cache.stats.coalesced} coalesced, {cache.stats.stale} stale, "
+                    f"{cache.stats.evictions} evictions "
+                    f"({cache.stats.hit_ratio:.1%} hit ratio)"
+                    for name, cache in ctx.bot.caches.items()
+                ]
+                or ["No caches registered."],
+                per_page=5,
+            )
+        ).start(ctx)
+
+    @dev.command(name="pools")
+    async def pools(self, ctx: Context):
+        """Shows the connections of the bot's http pools."""
+        entries = []
+
+        for name, pool in ctx.bot.pools:
+            entry = (
+                f"**{name}** (limit {pool.connector.limit or 'none'}): "
+                f"{pool.active} active, {pool.idle} idle"
+            )
+
+            # connector only pools, like discord's, aren't traced.
+            if isinstance(pool, HttpPool):
+                connect = pool.connect_time.snapshot().percentiles(50, 95)
+                entry += (
+                    f", {pool.waiting} waiting, "
+                    f"connect p50/p95 {' / '.join(map(format_ns, connect))}"
+                )
+
+            entries.append(entry)
+
+        await ViewMenuPages(FormatList(entries, per_page=5)).start(ctx)
+
+    @dev.command(name="perf")
+    async def perf(self, ctx: Context, *, command: Optional[str] = None):
+        """Shows latency percentiles of commands.
+        Given a command, this shows the percentiles of each phase of its invocations."""
+        timings = ctx.bot.command_latency
+
+        if command is None:
+            merged = CommandTimings.merged(timings.values()).phases["total"]
+            entries = [
+                f"**all**: {merged.count:,} runs, p50/p95/p99 "
+                f"{' / '.join(map(format_ns, merged.percentiles(50, 95, 99)))}"
+            ]
+            entries.extend(
+                f"**{name}**: {total.count:,} runs, p50/p95/p99 "
+                f"{' / '.join(map(format_ns, total.percentiles(50, 95, 99)))}"
+                for name, total in sorted(
+                    ((name, t.phases["total"]) for name, t in timings.items()),
+                    key=lambda x: x[1].percentile(95),
+                    reverse=True,
+                )
+            )
+        else:
+            found = ctx.bot.get_command(command)
+
+            if found is None:
+                raise commands.BadArgument(f"Command ``{command}`` not found.")
+
+            command_timings = timings.get(found.qualified_name)
+
+            if command_timings is None:
+                return await ctx.send(
+                    f"``{found.qualified_name}`` hasn't been run yet."
+                )
+
+            entries = [
+                f"**{phase}**: {histogram.count:,} runs, p50/p95/p99 "
+                f"{' / '.join(map(format_ns, histogram.percentiles(50, 95, 99)))}"
+                for phase, histogram in command_timings.phases.items()
+                if histogram.count
+            ]
+
+        await ViewMenuPages(FormatList(entries, per_page=10)).start(ctx)
+
+    @dev.command(name="tracing")
+    async def tracing(self, ctx: Context, enabled: bool):
+        """Turns span tracing on or off."""
+        tracer.enabled = enabled
+        await ctx.send(f"Tracing is now {'on' if enabled else 'off'}.")
+
+    @dev.command(name="spans")
+    async def spans(self, ctx: Context, traces: int = 5):
+        """Shows the spans of the last few traces as a tree."""
+        spans = list(tracer.spans)
+        roots = [s for s in spans if s.parent_id is None][-traces:]
+        children = {}
+
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        lines = []
+
+        def walk(span, depth):
+            attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            lines.append(
+                f"{'  ' * depth}{span.name} {span.elapsed * 1000:,.1f}ms {attributes}"
+            )
+            for child in sorted(
+                children.get(span.span_id, []), key=lambda s: s.start_ns
+            ):
+                walk(child, depth + 1)
+
+        for root in reversed(roots):
+            walk(root, 0)
+
+        if not lines:
+            return await ctx.send(
+                "No spans recorded." + ("" if tracer.enabled else " Tracing is off.")
+            )
+
+        text = "\n".join(lines)
+        await ViewMenuPages(
+            FormatList(
+                [str(Codeblock(text[v : v + 1900])) for v in range(0, len(text), 1900)],
+                per_page=1,
+            )
+        ).start(ctx)
+
 
 def setup(bot):
     bot.add_cog(Owner(bot))
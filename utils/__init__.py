@@ -1,7 +1,16 @@
 from .bot import Bot
+from .cache import TTLCache, CacheStats
+from .metrics import EventRates, LogLinearHistogram, RollingHistogram, CommandTimings
+from .persistent_cache import PersistentCache
+from .image_cache import ImageCache
+from .ratelimit import TokenBucket, RateLimits
+from .http_pools import ConnectorPool, HttpPool, HttpPools
 from .constants import Embed, Codeblock
-from .paginators import FormatList
+from .paginators import StreamPageSource, FormatList
 from .context import Context
-from .timer import Timer
+from .timer import Timer, Tracer, tracer
 from .xiv_character_cards import *
 from .webhook_logger import WebhookLogger
+from .watchdog import LoopWatchdog
+from .resilience import CircuitBreaker, HedgeStats
+from .search_index import SearchIndex
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
+import time
+from collections import Counter
 from typing import TYPE_CHECKING
 
 from discord.webhook.async_ import Webhook
 
 if TYPE_CHECKING:
-    from typing import Type, Optional
+    from typing import Type, Optional, Dict
+
+    from .cache import TTLCache
+    from .resilience import CircuitBreaker, HedgeStats
 
 import aiohttp
 import discord
@@ -14,6 +21,13 @@ import pytomlpp
 import jishaku
 from discord.ext import commands
 
+from .http_pools import HttpPools
+from .metrics import CommandTimings, HttpMetrics, RollingHistogram
+from .metrics_server import MetricsServer
+from .persistent_cache import PersistentCache
+from .ratelimit import RateLimits
+from .timer import Timer, tracer
+from .watchdog import LoopWatchdog
 from .webhook_logger import WebhookLogger
 
 jishaku.Flags.FORCE_PAGINATOR = True
@@ -25,14 +39,42 @@ class Bot(commands.Bot):
     session: aiohttp.ClientSession
     context: Type[commands.Context]
 
-    def __init__(self, session: aiohttp.ClientSession):
+    def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.session = session
         self.config = pytomlpp.load("./config.toml")
+        self.caches: Dict[str, TTLCache] = {}
+        # registered by cogs for the metrics server, like caches.
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hedges: Dict[str, Dict[str, HedgeStats]] = {}
+        self.ratelimits = RateLimits(self.config["bot"].get("ratelimits", {}))
+        latency_window = self.config["bot"].get("latency", {}).get("window", 300)
+        self.http_metrics = HttpMetrics(window=latency_window)
+        self.gateway_latency = RollingHistogram(latency_window)
+        self.rest_latency = RollingHistogram(latency_window)
+        self.command_latency: Dict[str, CommandTimings] = {}
+        self.command_errors: Counter[str] = Counter()
+        tracer.configure(**self.config["bot"].get("tracing", {}))
+
+        self.pools = HttpPools(
+            self.config["bot"].get("http", {}),
+            trace_configs=[
+                self.ratelimits.trace_config(),
+                self.http_metrics.trace_config(),
+                tracer.trace_config(),
+            ],
+        )
+        self.session = self.pools.session("default")
+
+        cache_config = self.config["bot"].get("cache", {})
+        self.store = PersistentCache(
+            cache_config.get("path", "cache.sqlite3"),
+            max_entries=cache_config.get("max_entries", 10_000),
+            flush_interval=cache_config.get("flush_interval", 5),
+        )
 
         self.hook = Webhook.from_url(
             self.config["bot"]["keys"]["webhook"],
-            session=session,
+            session=self.pools.session("webhook"),
             bot_token=self.config["bot"]["keys"]["token"],
         )
 
@@ -43,21 +85,51 @@ class Bot(commands.Bot):
             logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
         )
         root.addHandler(handler)
-        handler = WebhookLogger(webhook=self.hook)
-        handler.setFormatter(
+        self.webhook_logger = WebhookLogger(
+            webhook=self.hook,
+            limiter=self.ratelimits.get("webhook"),
+            **self.config["bot"].get("logging", {}),
+        )
+        self.webhook_logger.setFormatter(
             logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
         )
-        root.addHandler(handler)
+        root.addHandler(self.webhook_logger)
 
         intents = discord.Intents.default()
         intents.members = True
 
         super().__init__(
             **self.config["bot"]["config"],
+            connector=self.pools.connector("discord"),
             intents=intents,
             allowed_mentions=discord.AllowedMentions.none(),
         )
 
+        metrics_config = self.config["bot"].get("metrics", {})
+        self.metrics_server: Optional[MetricsServer] = None
+        if metrics_config.get("enabled", False):
+            self.metrics_server = MetricsServer(
+                self,
+                host=metrics_config.get("host", "127.0.0.1"),
+                port=metrics_config.get("port", 9100),
+            )
+            self.loop.create_task(self.metrics_server.start())
+
+        self._trace_discord_requests()
+        self.before_invoke(self._mark_body_start)
+        self.after_invoke(self._mark_body_end)
+        self.add_listener(self._record_command_error, "on_command_error")
+
+        watchdog_config = self.config["bot"].get("watchdog", {})
+        self.watchdog = LoopWatchdog(
+            interval=watchdog_config.get("interval", 0.25),
+            threshold=watchdog_config.get("threshold", 0.5),
+        )
+        if watchdog_config.get("enabled", True):
+            self.watchdog.start()
+
+        self.loop.create_task(self._sample_gateway_latency())
+
         for extension in self.config["bot"]["extensions"]:
             try:
                 self.load_extension(extension)
@@ -66,7 +138,121 @@ class Bot(commands.Bot):
             else:
                 self.logger.info("loaded extension `%s`", extension)
 
+    def load_extension(self, name: str, *, package: Optional[str] = None):
+        super().load_extension(name, package=package)
+        self.dispatch("extensions_changed", name)
+
+    def unload_extension(self, name: str, *, package: Optional[str] = None):
+        super().unload_extension(name, package=package)
+        self.dispatch("extensions_changed", name)
+
+    def reload_extension(self, name: str, *, package: Optional[str] = None):
+        super().reload_extension(name, package=package)
+        self.dispatch("extensions_changed", name)
+
     async def get_context(
         self, message, *, cls: Optional[Type[commands.Context]] = None
     ):
         return await super().get_context(message, cls=cls or self.context)
+
+    async def invoke(self, ctx: commands.Context):
+        timings: Optional[Dict[str, int]] = getattr(ctx, "timings", None)
+
+        if timings is None or ctx.command is None:
+            return await super().invoke(ctx)
+
+        timings["start"] = time.perf_counter_ns()
+
+        try:
+            with Timer("command", command=ctx.command.qualified_name):
+                await super().invoke(ctx)
+        finally:
+            self._record_timings(ctx, timings)
+
+    def _trace_discord_requests(self):
+        """Wraps the REST client, so requests to discord show up as spans and in :attr:`rest_latency`."""
+        request = self.http.request
+
+        async def traced_request(route, **kwargs):
+            with Timer(f"discord {route.method}", path=route.path):
+                start = time.perf_counter_ns()
+                try:
+                    return await request(route, **kwargs)
+                finally:
+                    self.rest_latency.record(time.perf_counter_ns() - start)
+
+        self.http.request = traced_request  # type: ignore
+
+    async def _sample_gateway_latency(self):
+        """Records every new heartbeat latency. The websocket only updates it once per heartbeat,
+        so it's polled and only recorded when it changes."""
+        await self.wait_until_ready()
+        last = None
+
+        while not self.is_closed():
+            latency = self.latency
+
+            if latency != last and math.isfinite(latency):
+                self.gateway_latency.record(int(latency * 1e9))
+                last = latency
+
+            await asyncio.sleep(5)
+
+    async def _mark_body_start(self, ctx: commands.Context):
+        timings = getattr(ctx, "timings", None)
+
+        if timings is not None:
+            timings["body"] = time.perf_counter_ns()
+
+    async def _mark_body_end(self, ctx: commands.Context):
+        timings = getattr(ctx, "timings", None)
+
+        if timings is not None:
+            timings["end"] = time.perf_counter_ns()
+
+    def _record_timings(self, ctx: commands.Context, timings: Dict[str, int]):
+        """Records how long each phase of an invocation took, from the marks left on the context.
+        Phases that never started (e.g. the body, if a check failed) aren't recorded.
+        For subcommands, everything their parent groups ran is counted as checks."""
+        assert ctx.command is not None
+
+        start = timings["start"]
+        end = timings.get("end") or time.perf_counter_ns()
+        converters = timings.get("converters")
+        body = timings.get("body")
+        send = getattr(ctx, "send_time", 0)
+
+        phases = {"total": end - start, "checks": (converters or body or end) - start}
+
+        if converters is not None:
+            phases["converters"] = (body or end) - converters
+
+        if body is not None:
+            phases["body"] = end - body - send
+            phases["send"] = send
+
+        name = ctx.command.qualified_name
+        command_timings = self.command_latency.get(name)
+
+        if command_timings is None:
+            command_timings = self.command_latency[name] = CommandTimings()
+
+        command_timings.record(phases)
+
+    async def _record_command_error(self, ctx: commands.Context, error: Exception):
+        if ctx.command is not None:
+            self.command_errors[ctx.command.qualified_name] += 1
+
+    async def close(self):
+        self.watchdog.stop()
+
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+
+        await super().close()
+        # sent or spooled while the webhook's session is still open.
+        logging.getLogger().removeHandler(self.webhook_logger)
+        await self.webhook_logger.shutdown()
+        await self.pools.close()
+        await self.store.close()
+        tracer.flush()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+    from .persistent_cache import PersistentCache
+
+__all__ = ("TTLCache", "CacheStats")
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class CacheStats:
+    """Counters describing how a :class:`TTLCache` is being used."""
+
+    __slots__ = ("hits", "misses", "coalesced", "disk_hits", "stale", "evictions")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        served = self.hits + self.coalesced + self.disk_hits + self.stale
+        total = self.hits + self.misses + self.coalesced + self.stale
+        return served / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "disk_hits": self.disk_hits,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class TTLCache(Generic[K, V]):
+    """An in-memory LRU cache where entries also expire after ``ttl`` seconds.
+
+    Concurrent :meth:`get_or_fetch` calls for the same key share a single in-flight
+    future, so only one of them actually runs the factory.
+
+    If a :class:`PersistentCache` is given, misses are looked up on disk before calling the
+    factory and new values are written through to it, so the cache survives restarts.
+    Values must then be json serializable.
+
+    With a ``stale_ttl``, expired entries are kept for that much longer, in memory and on disk.
+    During that time :meth:`get_or_fetch` returns them right away and refreshes them in the background.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        maxsize: int,
+        store: Optional[PersistentCache] = None,
+        namespace: str = "",
+        stale_ttl: float = 0,
+    ) -> None:
+        """Creates a new cache.
+
+        Args:
+            ttl (float): How many seconds an entry stays valid for.
+            maxsize (int): The maximum amount of entries before the least recently used is evicted.
+            store (Optional[PersistentCache], optional): The on-disk store to back this cache with. Defaults to None.
+            namespace (str, optional): The namespace to use in ``store``. Defaults to "".
+            stale_ttl (float, optional): How many seconds past ``ttl`` an entry can still be served
+                while it's refreshed. Defaults to 0.
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.store = store
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._data: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self._inflight: Dict[K, asyncio.Future[V]] = {}
+        # keys loaded stale from the store, refreshed once that fetch is done.
+        self._stale_loads: Dict[K, Callable[[], Awaitable[V]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self._lookup(key) is not None
+
+    @property
+    def inflight(self) -> int:
+        """How many fetches are running."""
+        return len(self._inflight)
+
+    def _lookup(self, key: K, *, stale: bool = False) -> Optional[Tuple[float, V]]:
+        entry = self._data.get(key)
+
+        if entry is None:
+            return None
+
+        now = time.monotonic()
+
+        if entry[0] + self.stale_ttl <= now:
+            del self._data[key]
+            return None
+
+        if entry[0] <= now and not stale:
+            return None
+
+        self._data.move_to_end(key)
+        return entry
+
+    def expires_in(self, key: K) -> float:
+        """How many seconds ``key`` stays fresh for, or 0 if it's stale or missing."""
+        entry = self._data.get(key)
+        return max(entry[0] - time.monotonic(), 0) if entry is not None else 0
+
+    def get(self, key: K) -> Optional[V]:
+        """Returns the cached value for ``key``, or ``None`` if it is missing or expired."""
+        entry = self._lookup(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: K, value: V) -> None:
+        self._set_local(key, value)
+
+        if self.store is not None:
+            self.store.set(
+                self.namespace, json.dumps(key), value, self.ttl + self.stale_ttl
+            )
+
+    def _set_local(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._data.pop(key, None)
+
+        if self.store is not None:
+            self.store.delete(self.namespace, json.dumps(key))
+
+    def clear(self) -> None:
+        self._data.clear()
+
+        if self.store is not None:
+            self.store.clear(self.namespace)
+
+    async def get_or_fetch(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """Returns the cached value for ``key``, calling ``factory`` to fill it on a miss.
+
+        Exceptions raised by ``factory`` are propagated to every waiter and are not cached.
+
+        Args:
+            key (K): The cache key.
+            factory (Callable[[], Awaitable[V]]): Produces the value if it isn't cached.
+
+        Returns:
+            V: The cached or freshly fetched value.
+        """
+        entry = self._lookup(key, stale=True)
+
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.stats.hits += 1
+            else:
+                self.stats.stale += 1
+                # the store's copy expired along with this one.
+                self._start_fetch(key, factory, use_store=False)
+
+            return entry[1]
+
+        future = self._inflight.get(key)
+
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            future = self._start_fetch(key, factory)
+
+        # shielded so one waiter getting cancelled doesn't cancel the fetch for the rest.
+        return await asyncio.shield(future)
+
+    async def refresh(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """Fetches ``key`` again even if it's cached, sharing a fetch that's already running."""
+        future = self._start_fetch(key, factory, use_store=False)
+        return await asyncio.shield(future)
+
+    def _start_fetch(
+        self, key: K, factory: Callable[[], Awaitable[V]], *, use_store: bool = True
+    ) -> asyncio.Future[V]:
+        future = self._inflight.get(key)
+
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key, factory, use_store))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._fetch_done(key, f))
+
+        return future
+
+    async def _fetch(
+        self, key: K, factory: Callable[[], Awaitable[V]], use_store: bool = True
+    ) -> V:
+        if self.store is not None and use_store:
+            stored = await self.store.get(self.namespace, json.dumps(key))
+
+            if stored is not None:
+                value, expires = stored
+                self.stats.disk_hits += 1
+                # keeps the expiry it was stored with, rather than starting a new ttl.
+                ttl = expires - self.stale_ttl - time.time()
+                self._set_local(key, value, ttl)
+
+                if ttl <= 0:
+                    self._stale_loads[key] = factory
+
+                return value
+
+        value = await factory()
+        self.set(key, value)
+        return value
+
+    def _fetch_done(self, key: Hashable, future: asyncio.Future[V]) -> None:
+        if self._inflight.get(key) is future:  # type: ignore
+            del self._inflight[key]  # type: ignore
+
+        factory = self._stale_loads.pop(key, None)  # type: ignore
+
+        if not future.cancelled():
+            # mark the exception as retrieved in case every waiter was cancelled.
+            if future.exception() is None and factory is not None:
+                self._start_fetch(key, factory, use_store=False)  # type: ignore
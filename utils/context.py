@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING
 from utils import Embed
 
 if TYPE_CHECKING:
-    from typing import Union
+    from typing import Any, Dict, List, Union
 
     from .bot import Bot
 
@@ -16,6 +17,35 @@ class Context(commands.Context):
     if TYPE_CHECKING:
         bot: Bot
 
+    def __init__(self, **attrs):
+        # perf_counter_ns marks of when each phase of the invocation started, see Bot.invoke.
+        self.timings: Dict[str, int] = {}
+        self.send_time = 0
+        super().__init__(**attrs)
+
+    @property
+    def args(self) -> List[Any]:
+        return self._args
+
+    @args.setter
+    def args(self, value: List[Any]) -> None:
+        self._args = value
+
+        # Command.prepare resets the args once the checks have passed, right before running
+        # the converters, which is the only place to tell the two phases apart. Every prepare
+        # overwrites the mark, so for a subcommand it's the last one, and whatever its parent
+        # groups ran before is counted as checks. This relies on discord.py internals.
+        if "start" in self.timings:
+            self.timings["converters"] = time.perf_counter_ns()
+
+    async def send(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+
+        try:
+            return await super().send(*args, **kwargs)
+        finally:
+            self.send_time += time.perf_counter_ns() - start
+
     @property
     def embed(self):
         return Embed().set_footer(
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 from typing import TYPE_CHECKING
 from discord.components import SelectOption
 
 from discord.ui.select import select
 
 
+from .cache import TTLCache
 from .constants import Embed
+from .search_index import SearchIndex
 
 if TYPE_CHECKING:
-    from typing import Mapping, List, Optional, Tuple, Union, Any
+    from typing import Mapping, List, Optional, Tuple, Union, Any, Hashable
 
     from .bot import Bot
 
@@ -21,6 +25,90 @@ from discord.ext.menus.views import ViewMenuPages
 USE_HELP = "Use ``{0.clean_prefix}help <command/module>`` for more help!"
 
 
+class HelpIndex:
+    """The cogs and commands shown in help, and caches of what each audience can see.
+
+    Filter results are cached per (guild, channel permissions, owner) and rendered pages
+    per filter result, so checks only run once per audience. Everything is dropped
+    whenever an extension is loaded, unloaded or reloaded, and the search index is rebuilt.
+    """
+
+    def __init__(self, bot: Bot, *, ttl: float = 300) -> None:
+        self.bot = bot
+        self.filters: TTLCache[Hashable, List[commands.Command]] = TTLCache(
+            ttl=ttl, maxsize=1024
+        )
+        self.pages: TTLCache[Hashable, discord.Embed] = TTLCache(ttl=ttl, maxsize=1024)
+        self._cogs: Optional[List[Tuple[commands.Cog, List[commands.Command]]]] = None
+        self.search = self.build_search()
+
+    @property
+    def cogs(self) -> List[Tuple[commands.Cog, List[commands.Command]]]:
+        """Every cog with at least one command, along with its commands."""
+        if self._cogs is None:
+            self._cogs = [
+                (cog, cog.get_commands())
+                for cog in self.bot.cogs.values()
+                if cog.get_commands()
+            ]
+        return self._cogs
+
+    def build_search(self) -> SearchIndex[commands.Command]:
+        """Indexes every command by its name, aliases, help and the description of its cog."""
+        search: SearchIndex[commands.Command] = SearchIndex()
+
+        for command in self.bot.walk_commands():
+            search.add(
+                command,
+                (command.qualified_name, 3),
+                (" ".join(command.aliases), 2),
+                (command.help or "", 1),
+                (command.cog.description if command.cog else "", 0.5),
+            )
+
+        return search
+
+    async def invalidate(self, *args: Any) -> None:
+        self._cogs = None
+        self.filters.clear()
+        self.pages.clear()
+        self.search = self.build_search()
+
+
+class CachedPageSource(menus.ListPageSource):
+    """A list page source that reuses pages already rendered for the same ``cache_key``."""
+
+    def __init__(
+        self,
+        entries,
+        *,
+        per_page: int,
+        index: Optional[HelpIndex] = None,
+        cache_key: Hashable = None,
+    ):
+        super().__init__(entries, per_page=per_page)
+        self.index = index
+        self.cache_key = cache_key
+
+    async def format_page(self, menu, entries):
+        if self.index is None or self.cache_key is None:
+            return await self.render_page(menu, entries)
+
+        key = (self.cache_key, menu.current_page)
+        embed = self.index.pages.get(key)
+
+        if embed is None:
+            embed = await self.render_page(menu, entries)
+            self.index.pages.set(key, embed)
+
+        embed = embed.copy()
+        embed.timestamp = discord.utils.utcnow()
+        return embed
+
+    async def render_page(self, menu, entries) -> discord.Embed:
+        raise NotImplementedError
+
+
 class HelpViewMenu(ViewMenuPages):
     def __init__(self, source, **kwargs):
         super().__init__(source, delete_message_after=True)
@@ -59,12 +147,20 @@ class HelpViewMenu(ViewMenuPages):
         return view
 
 
-class FormatBotHelp(menus.ListPageSource):
-    def __init__(self, entries, ctx: commands.Context, *, per_page: Optional[int] = 5):
-        super().__init__(entries, per_page=per_page)
+class FormatBotHelp(CachedPageSource):
+    def __init__(
+        self,
+        entries,
+        ctx: commands.Context,
+        *,
+        per_page: Optional[int] = 5,
+        index: Optional[HelpIndex] = None,
+        cache_key: Hashable = None,
+    ):
+        super().__init__(entries, per_page=per_page, index=index, cache_key=cache_key)
         self.ctx = ctx
 
-    async def format_page(
+    async def render_page(
         self,
         menu: ViewMenuPages,
         entries: List[Tuple[commands.Cog, List[commands.Command]]],
@@ -84,7 +180,7 @@ class FormatBotHelp(menus.ListPageSource):
         return embed
 
 
-class FormatHelp(menus.ListPageSource):
+class FormatHelp(CachedPageSource):
     """A listpagesource that generates for both cog and commands, since they are roughly the same"""
 
     def __init__(
@@ -93,22 +189,30 @@ class FormatHelp(menus.ListPageSource):
         ctx: commands.Context,
         *,
         per_page: Optional[int] = 5,
-        group: Union[commands.Cog, commands.Group],
+        group: Optional[Union[commands.Cog, commands.Group]] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        index: Optional[HelpIndex] = None,
+        cache_key: Hashable = None,
     ):
-        super().__init__(entries, per_page=per_page)
+        super().__init__(entries, per_page=per_page, index=index, cache_key=cache_key)
         self.ctx = ctx
         self.group = group
+        self.title = title or (group and f"Help for {group.qualified_name}!")
+        self.description = description
 
-    async def format_page(
+    async def render_page(
         self, menu: menus.MenuPages, entries: List[commands.Command]
     ) -> Embed:
         embed = Embed(
-            title=f"Help for {self.group.qualified_name}!",
+            title=self.title,
             description=f"{USE_HELP.format(self.ctx)} \n\n",
         )
         assert isinstance(embed.description, str)
 
-        if isinstance(self.group, commands.Group):
+        if self.description is not None:
+            embed.description += self.description
+        elif isinstance(self.group, commands.Group):
             embed.description += f"{self.group.help}"
         elif isinstance(self.group, commands.Cog):
             embed.description += f"{self.group.description}"
@@ -151,14 +255,82 @@ class HelpCogSelect(Select):
 
 class HelpCommand(commands.HelpCommand):
     sctx: commands.Context
+    query: Optional[str] = None
+
+    @property
+    def index(self) -> HelpIndex:
+        return self.context.bot.help_index  # type: ignore
 
     async def filter_commands(self, commands, *, sort=False, key=None):
+        """Same as :meth:`commands.HelpCommand.filter_commands`, except that owners see everything
+        and every command's checks run concurrently."""
         assert self.context is not None  # appease the linter
 
         if await self.context.bot.is_owner(self.context.author):
             return commands
 
-        return await super().filter_commands(commands, sort=sort, key=key)
+        if sort and key is None:
+            key = lambda c: c.name
+
+        iterator = (
+            list(commands)
+            if self.show_hidden
+            else [c for c in commands if not c.hidden]
+        )
+
+        if self.verify_checks is False or (
+            self.verify_checks is None and not self.context.guild
+        ):
+            return sorted(iterator, key=key) if sort else iterator
+
+        async def predicate(cmd: commands.Command) -> bool:
+            # can_run swaps ctx.command while it runs, so concurrent checks each get a copy.
+            try:
+                return await cmd.can_run(copy.copy(self.context))
+            except commands.CommandError:
+                return False
+
+        results = await asyncio.gather(*(predicate(cmd) for cmd in iterator))
+        ret = [cmd for cmd, valid in zip(iterator, results) if valid]
+
+        return sorted(ret, key=key) if sort else ret
+
+    async def audience(self) -> Hashable:
+        """What the checks of a command depend on, used to share filter results between users."""
+        ctx = self.context
+        assert ctx is not None  # appease the linter
+
+        permissions = (
+            ctx.channel.permissions_for(ctx.author).value  # type: ignore
+            if ctx.guild
+            else 0
+        )
+        return (
+            ctx.guild and ctx.guild.id,
+            permissions,
+            await ctx.bot.is_owner(ctx.author),
+        )
+
+    async def cached_filter(
+        self, scope: str, commands: List[commands.Command]
+    ) -> List[commands.Command]:
+        """Runs :meth:`filter_commands`, reusing the result for the same scope and audience."""
+        return await self.index.filters.get_or_fetch(
+            (scope, await self.audience()), lambda: self.filter_commands(commands)
+        )
+
+    async def filtered_cogs(
+        self,
+    ) -> List[Tuple[commands.Cog, List[commands.Command]]]:
+        """Every cog along with the commands the author can use, skipping cogs where that's none."""
+        cogs = self.index.cogs
+        filtered = await asyncio.gather(
+            *(
+                self.cached_filter(f"cog:{cog.qualified_name}", cmds)
+                for cog, cmds in cogs
+            )
+        )
+        return [(cog, cmds) for (cog, _), cmds in zip(cogs, filtered) if cmds]
 
     async def get_filtered_cogs(self) -> List[commands.Cog]:
         """Returns a list of filtered cogs.
@@ -167,50 +339,55 @@ class HelpCommand(commands.HelpCommand):
         Returns:
             List[commands.Cog]: A list of the cogs.
         """
-        return [
-            cog
-            for cog in self.context.bot.cogs.values()  # type: ignore
-            if len(cog.get_commands()) > 0
-            and await self.filter_commands(cog.get_commands())
-        ]
+        return [cog for cog, _ in await self.filtered_cogs()]
+
+    async def page_key(self, scope: str) -> Hashable:
+        return (scope, await self.audience(), self.context.clean_prefix)  # type: ignore
 
     async def send_bot_help(
         self, mapping: Mapping[Optional[commands.Cog], List[commands.Command]]
     ):
         assert self.context is not None  # appease the linter
 
-        filtered: List[Tuple[commands.Cog, List[commands.Command]]] = []
-
-        for k, v in mapping.items():
-            _filtered = await self.filter_commands(v)
-
-            if _filtered and k:
-                filtered.append((k, _filtered))
+        filtered = await self.filtered_cogs()
 
         if not filtered:
             return await self.get_destination().send("You cannot use any commands!")
 
         await HelpViewMenu(
-            FormatBotHelp(filtered, self.context),
-            select=HelpCogSelect(self, await self.get_filtered_cogs()),
+            FormatBotHelp(
+                filtered,
+                self.context,
+                index=self.index,
+                cache_key=await self.page_key("bot"),
+            ),
+            select=HelpCogSelect(self, [cog for cog, _ in filtered]),
         ).start(self.context)
 
     async def send_group_help(self, group: commands.Group):
         assert self.context is not None  # appease the linter
 
-        filtered = await self.filter_commands(list(group.commands))
+        scope = f"group:{group.qualified_name}"
+        filtered = await self.cached_filter(scope, list(group.commands))
 
         if not filtered:
             return await self.send_command_help(group)
 
         await HelpViewMenu(
-            source=FormatHelp(filtered, self.context, group=group)
+            source=FormatHelp(
+                filtered,
+                self.context,
+                group=group,
+                index=self.index,
+                cache_key=await self.page_key(scope),
+            )
         ).start(self.context)
 
     async def send_cog_help(self, cog: commands.Cog):
         assert self.context is not None  # appease the linter
 
-        filtered = await self.filter_commands(cog.get_commands())
+        scope = f"cog:{cog.qualified_name}"
+        filtered = await self.cached_filter(scope, cog.get_commands())
 
         if not filtered:
             return await self.get_destination().send(
@@ -218,11 +395,51 @@ class HelpCommand(commands.HelpCommand):
             )
 
         await HelpViewMenu(
-            source=FormatHelp(filtered, self.context, group=cog),
+            source=FormatHelp(
+                filtered,
+                self.context,
+                group=cog,
+                index=self.index,
+                cache_key=await self.page_key(scope),
+            ),
             message=getattr(self, "message", None),
             select=HelpCogSelect(self, await self.get_filtered_cogs()),
         ).start(self.context)
 
+    def command_not_found(self, string: str) -> str:
+        self.query = string
+        return super().command_not_found(string)
+
+    def subcommand_not_found(self, command: commands.Command, string: str) -> str:
+        self.query = f"{command.qualified_name} {string}"
+        return super().subcommand_not_found(command, string)
+
+    async def search(self, query: str) -> List[commands.Command]:
+        """The commands the author can use that best match ``query``, best first."""
+        matches = [command for command, _ in self.index.search.search(query, limit=25)]
+        return await self.cached_filter(f"search:{query.casefold()}", matches)
+
+    async def send_error_message(self, error: str):
+        """Shows the commands closest to what was asked for, falling back to the error itself."""
+        assert self.context is not None  # appease the linter
+
+        query, self.query = self.query, None
+        matches = await self.search(query) if query is not None else []
+
+        if not matches:
+            return await self.get_destination().send(error)
+
+        await HelpViewMenu(
+            source=FormatHelp(
+                matches,
+                self.context,
+                title="Did you mean...",
+                description=discord.utils.escape_mentions(error),
+                index=self.index,
+                cache_key=await self.page_key(f"search:{query.casefold()}"),  # type: ignore
+            )
+        ).start(self.context)
+
     async def send_command_help(self, command: commands.Command):
         assert self.context is not None  # appease the linter
 
@@ -247,8 +464,11 @@ class HelpCommand(commands.HelpCommand):
 
 
 def setup(bot: Bot):
+    bot.help_index = HelpIndex(bot)
+    bot.add_listener(bot.help_index.invalidate, "on_extensions_changed")
     bot.help_command = HelpCommand()
 
 
 def teardown(bot: Bot):
+    bot.remove_listener(bot.help_index.invalidate, "on_extensions_changed")
     bot.help_command = commands.DefaultHelpCommand()
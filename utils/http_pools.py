@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from .metrics import RollingHistogram
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+__all__ = ("ConnectorPool", "HttpPool", "HttpPools")
+
+DEFAULT_POOL: Dict[str, Any] = {
+    "limit": 100,
+    "limit_per_host": 0,
+    "keepalive_timeout": 15,
+    "ttl_dns_cache": 300,
+    "timeout": 300,
+    "connect_timeout": None,
+    "read_timeout": None,
+}
+
+DEFAULT_POOLS: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "discord": {},
+    "webhook": {"limit": 10},
+    "xivapi": {"limit": 20},
+    "cards": {"limit": 10, "keepalive_timeout": 30, "connect_timeout": 10},
+}
+
+# discord.py builds its own session on these, so they only get a connector.
+CONNECTOR_ONLY = ("discord",)
+
+
+def _connector(
+    *,
+    limit: int,
+    limit_per_host: int,
+    keepalive_timeout: float,
+    ttl_dns_cache: Optional[int],
+    **_: Any,
+) -> aiohttp.TCPConnector:
+    return aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        ttl_dns_cache=ttl_dns_cache,
+    )
+
+
+class ConnectorPool:
+    """A connection pool to one upstream, used by another library's session.
+
+    Only the connections can be counted, as requests aren't traced.
+    """
+
+    __slots__ = ("name", "connector")
+
+    def __init__(self, name: str, **settings: Any) -> None:
+        self.name = name
+        self.connector = _connector(**settings)
+
+    @property
+    def active(self) -> int:
+        """Connections currently handling a request."""
+        # aiohttp has no public api for this.
+        return len(self.connector._acquired)  # type: ignore
+
+    @property
+    def idle(self) -> int:
+        """Connections kept alive, waiting to be reused."""
+        return sum(len(conns) for conns in self.connector._conns.values())  # type: ignore
+
+    async def close(self) -> None:
+        await self.connector.close()
+
+
+class HttpPool(ConnectorPool):
+    """A connection pool to one upstream, and the session that uses it."""
+
+    __slots__ = ("session", "waiting", "connect_time")
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        trace_configs: Sequence[aiohttp.TraceConfig] = (),
+        limit: int,
+        limit_per_host: int,
+        keepalive_timeout: float,
+        ttl_dns_cache: Optional[int],
+        timeout: Optional[float],
+        connect_timeout: Optional[float],
+        read_timeout: Optional[float],
+    ) -> None:
+        super().__init__(
+            name,
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=ttl_dns_cache,
+        )
+        self.waiting = 0
+        self.connect_time = RollingHistogram()
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=aiohttp.ClientTimeout(
+                total=timeout, connect=connect_timeout, sock_read=read_timeout
+            ),
+            trace_configs=[*trace_configs, self.trace_config()],
+        )
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Counts requests waiting for a free connection, and times new connections."""
+
+        async def on_connection_queued_start(session, ctx, params):
+            self.waiting += 1
+
+        async def on_connection_queued_end(session, ctx, params):
+            self.waiting -= 1
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter_ns()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connect_time.record(time.perf_counter_ns() - ctx.connect_start)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+
+class HttpPools:
+    """Named connection pools, so a slow upstream can only use up its own connections.
+
+    Configured by the ``[bot.http.<name>]`` tables in ``config.toml``, with ``limit``,
+    ``limit_per_host``, ``keepalive_timeout``, ``ttl_dns_cache``, ``timeout``,
+    ``connect_timeout`` and ``read_timeout``. Unknown names get the ``default`` pool.
+    Pools in ``CONNECTOR_ONLY`` are a :class:`ConnectorPool` for another library's session,
+    so their timeouts don't apply and only their connections are counted.
+    Must be created inside a running event loop.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Dict[str, Any]],
+        *,
+        trace_configs: Sequence[aiohttp.TraceConfig] = (),
+    ) -> None:
+        """Creates every pool in ``DEFAULT_POOLS`` and ``config``.
+
+        Args:
+            config (Dict[str, Dict[str, Any]]): The settings of each pool, over the defaults.
+            trace_configs (Sequence[aiohttp.TraceConfig], optional): Trace configs every session is created with.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.pools: Dict[str, ConnectorPool] = {}
+
+        for name in {**DEFAULT_POOLS, **config}:
+            settings = {
+                **DEFAULT_POOL,
+                **DEFAULT_POOLS.get(name, {}),
+                **config.get(name, {}),
+            }
+
+            if name in CONNECTOR_ONLY:
+                self.pools[name] = ConnectorPool(name, **settings)
+            else:
+                self.pools[name] = HttpPool(
+                    name, trace_configs=trace_configs, **settings
+                )
+
+    def __iter__(self) -> Iterator[Tuple[str, ConnectorPool]]:
+        return iter(self.pools.items())
+
+    def get(self, name: str) -> ConnectorPool:
+        return self.pools.get(name) or self.pools["default"]
+
+    def session(self, name: str) -> aiohttp.ClientSession:
+        """The session of the ``name`` pool.
+
+        Raises:
+            ValueError: The pool is only a connector.
+        """
+        pool = self.get(name)
+
+        if not isinstance(pool, HttpPool):
+            raise ValueError(f"the {name} pool has no session of its own")
+
+        return pool.session
+
+    def connector(self, name: str) -> aiohttp.TCPConnector:
+        return self.get(name).connector
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
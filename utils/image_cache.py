@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List, Optional, Tuple
+
+__all__ = ("ImageCache",)
+
+
+class ImageCache:
+    """A content addressed store of images on disk, capped in size.
+
+    Images are saved under the sha256 of their contents, so the same image is only stored
+    once. Once the cache grows past ``max_bytes``, the least recently used images are deleted.
+    File access happens on a dedicated worker thread, and the directory is only scanned on first use.
+    """
+
+    def __init__(self, path: str, *, max_bytes: int = 100_000_000) -> None:
+        """Creates a new image cache.
+
+        Args:
+            path (str): The directory images are stored in. Created if it doesn't exist.
+            max_bytes (int, optional): How big the cache can grow before images are evicted.
+                Defaults to 100_000_000.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="images")
+        # digest -> size, least recently used first.
+        self._files: Optional[OrderedDict[str, int]] = None
+        self._opening: Optional[asyncio.Future[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._files or ())
+
+    def __contains__(self, digest: str) -> bool:
+        return self._files is not None and digest in self._files
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, f"{digest}.png")
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+
+        for entry in os.scandir(self.path):
+            digest, ext = os.path.splitext(entry.name)
+
+            if ext == ".png" and entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, digest, stat.st_size))
+
+        return sorted(files)
+
+    async def open(self) -> None:
+        """Indexes the images already on disk, oldest first. Called on first use."""
+        if self._files is not None:
+            return
+
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(self._open())
+
+        await asyncio.shield(self._opening)
+
+    async def _open(self) -> None:
+        files: OrderedDict[str, int] = OrderedDict()
+
+        for _, digest, size in await self._run(self._scan):
+            files[digest] = size
+
+        self.size = sum(files.values())
+        self._files = files
+
+    def _read(self, digest: str) -> bytes:
+        path = self._file(digest)
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        # keeps the recency order across restarts.
+        os.utime(path)
+        return data
+
+    def _write(self, digest: str, data: bytes) -> None:
+        path = self._file(digest)
+
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+
+        os.replace(f"{path}.tmp", path)
+
+    def _remove(self, digests: List[str]) -> None:
+        for digest in digests:
+            try:
+                os.remove(self._file(digest))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, digest: str) -> Optional[bytes]:
+        """Returns the image stored under ``digest``, if it's still cached."""
+        await self.open()
+        assert self._files is not None
+
+        if digest not in self._files:
+            return None
+
+        self._files.move_to_end(digest)
+
+        try:
+            return await self._run(self._read, digest)
+        except FileNotFoundError:
+            self.size -= self._files.pop(digest, 0)
+            return None
+
+    async def put(self, data: bytes) -> str:
+        """Stores an image, evicting the least recently used images if the cache is full.
+
+        Returns:
+            str: The digest to get the image back with.
+        """
+        await self.open()
+        assert self._files is not None
+
+        digest = hashlib.sha256(data).hexdigest()
+
+        if digest in self._files:
+            self._files.move_to_end(digest)
+            return digest
+
+        await self._run(self._write, digest, data)
+        self._files[digest] = len(data)
+        self.size += len(data)
+
+        evicted = []
+
+        while self.size > self.max_bytes and len(self._files) > 1:
+            old, size = self._files.popitem(last=False)
+            self.size -= size
+            evicted.append(old)
+
+        if evicted:
+            self.logger.debug("evicting %d images", len(evicted))
+            await self._run(self._remove, evicted)
+
+        return digest
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
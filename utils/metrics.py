@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from array import array
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+__all__ = (
+    "EventCounter",
+    "EventRates",
+    "Histogram",
+    "LogLinearHistogram",
+    "RollingHistogram",
+    "CommandTimings",
+    "HttpMetrics",
+)
+
+SECONDS = 60
+MINUTES = 60
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# log-linear histograms split every power of two into 2 ** SUB_BITS linear buckets,
+# so any recorded value is off by at most ~3%.
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+
+COMMAND_PHASES = ("total", "checks", "converters", "body", "send")
+
+
+class EventCounter:
+    """Counts of a single event, in fixed-size rings of per-second and per-minute buckets.
+
+    Each ring has one more bucket than it covers, for the one still being filled.
+    """
+
+    __slots__ = ("total", "seconds", "minutes")
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.seconds = array("L", [0]) * (SECONDS + 1)
+        self.minutes = array("L", [0]) * (MINUTES + 1)
+
+
+class EventRates:
+    """Tracks how often events happen over the last minute, 15 minutes and hour.
+
+    Recording an event is only a couple of array increments. All the bucket bookkeeping
+    happens in :meth:`tick`, which runs once a second in the background.
+    """
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, EventCounter] = {}
+        self._second = 0
+        self._minute = 0
+        self._ticks = 0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def __iter__(self) -> Iterator[Tuple[str, EventCounter]]:
+        return iter(self.counters.items())
+
+    def hit(self, event: str) -> None:
+        """Records an event happening."""
+        counter = self.counters.get(event)
+
+        if counter is None:
+            counter = self.counters[event] = EventCounter()
+
+        counter.total += 1
+        counter.seconds[self._second] += 1
+
+    def tick(self) -> None:
+        """Moves every counter on to the next second, folding the finished second into its minute."""
+        second, minute = self._second, self._minute
+        self._ticks += 1
+        self._second = next_second = self._ticks % (SECONDS + 1)
+        rolled = self._ticks % SECONDS == 0
+
+        if rolled:
+            self._minute = (minute + 1) % (MINUTES + 1)
+
+        for counter in self.counters.values():
+            counter.minutes[minute] += counter.seconds[second]
+            counter.seconds[next_second] = 0
+
+            if rolled:
+                counter.minutes[self._minute] = 0
+
+    def start(self) -> None:
+        """Starts ticking in the background. Does nothing if already started."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._ticker())
+
+    async def _ticker(self) -> None:
+        next_tick = time.monotonic() + 1
+
+        while True:
+            await asyncio.sleep(max(next_tick - time.monotonic(), 0))
+
+            # catch up if the loop was blocked for longer than a second.
+            while next_tick <= time.monotonic():
+                self.tick()
+                next_tick += 1
+
+    def _finished(self, event: str, window: int) -> Tuple[int, int]:
+        """How many times ``event`` happened in the finished buckets making up the last ``window``
+        seconds, and how many seconds those buckets cover. Fewer than that have finished right
+        after starting."""
+        counter = self.counters.get(event)
+        minutes = min(window // SECONDS, MINUTES, self._ticks // SECONDS)
+
+        # windows up to a minute are exact to the second, longer ones to the minute.
+        if window <= SECONDS or not minutes:
+            seconds = min(window, SECONDS, self._ticks)
+            count = counter and sum(
+                counter.seconds[(self._second - i) % (SECONDS + 1)]
+                for i in range(1, seconds + 1)
+            )
+            return count or 0, seconds
+
+        count = counter and sum(
+            counter.minutes[(self._minute - i) % (MINUTES + 1)]
+            for i in range(1, minutes + 1)
+        )
+        return count or 0, minutes * SECONDS
+
+    def count(self, event: str, window: int) -> int:
+        """How many times ``event`` happened in the last ``window`` seconds, up to an hour.
+        Only finished seconds / minutes are counted."""
+        return self._finished(event, window)[0]
+
+    def rate(self, event: str, window: int) -> float:
+        """The per-second rate of ``event`` over the last ``window`` seconds, up to an hour."""
+        count, seconds = self._finished(event, window)
+        return count / seconds if seconds else 0.0
+
+
+class Histogram:
+    """A histogram with fixed upper bounds, in the shape Prometheus expects."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = array("L", [0]) * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """Yields ``(upper bound, count <= bound)`` pairs, ending with ``inf``."""
+        total = 0
+
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class LogLinearHistogram:
+    """A sparse histogram of nanosecond values with log-linear buckets.
+
+    Histograms with the same layout can be merged by adding their buckets, so
+    they can be combined across commands or processes.
+    """
+
+    __slots__ = ("buckets", "count", "sum", "min", "max")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0
+        self.min = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket_of(value: int) -> int:
+        if value < 2 * SUB_BUCKETS:
+            return value
+
+        shift = value.bit_length() - SUB_BITS - 1
+        return (shift << SUB_BITS) + (value >> shift)
+
+    @staticmethod
+    def bucket_bounds(index: int) -> Tuple[int, int]:
+        """The lowest and highest value that fall into a bucket."""
+        if index < 2 * SUB_BUCKETS:
+            return index, index
+
+        shift = (index >> SUB_BITS) - 1
+        mantissa = index - (shift << SUB_BITS)
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        """Records a value, in nanoseconds."""
+        value = max(value, 0)
+        index = self.bucket_of(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: LogLinearHistogram) -> None:
+        """Adds every value recorded in ``other`` to this histogram."""
+        if not other.count:
+            return
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+        self.min = min(self.min, other.min) if self.count else other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, percentile: float) -> int:
+        """Estimates the value at ``percentile`` (0-100), in nanoseconds."""
+        if not self.count:
+            return 0
+
+        target = max(1, round(self.count * percentile / 100))
+        seen = 0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+
+            if seen >= target:
+                low, high = self.bucket_bounds(index)
+                return min(max((low + high) // 2, self.min), self.max)
+
+        return self.max
+
+    def percentiles(self, *percentiles: float) -> Tuple[int, ...]:
+        return tuple(self.percentile(p) for p in percentiles)
+
+
+class RollingHistogram:
+    """A :class:`LogLinearHistogram` over the last ``window`` seconds.
+
+    Values go into one of ``slices`` histograms, each covering an equal part of the
+    window. The oldest slice is cleared as time moves on, and reads merge the rest.
+    """
+
+    __slots__ = ("window", "slices", "_histograms", "_slice_length", "_current")
+
+    def __init__(self, window: float = 300, slices: int = 10) -> None:
+        self.window = window
+        self.slices = slices
+        self._slice_length = window / slices
+        self._histograms = [LogLinearHistogram() for _ in range(slices)]
+        self._current = int(time.monotonic() // self._slice_length)
+
+    def _rotate(self) -> None:
+        now = int(time.monotonic() // self._slice_length)
+
+        if now == self._current:
+            return
+
+        for step in range(1, min(now - self._current, self.slices) + 1):
+            self._histograms[(self._current + step) % self.slices] = (
+                LogLinearHistogram()
+            )
+
+        self._current = now
+
+    def record(self, value: int) -> None:
+        """Records a value, in nanoseconds."""
+        self._rotate()
+        self._histograms[self._current % self.slices].record(value)
+
+    def snapshot(self) -> LogLinearHistogram:
+        """Merges every slice still inside the window into one histogram."""
+        self._rotate()
+        merged = LogLinearHistogram()
+
+        for histogram in self._histograms:
+            merged.merge(histogram)
+
+        return merged
+
+
+class CommandTimings:
+    """Latency histograms of a command, split up by the phase of the invocation."""
+
+    __slots__ = ("phases",)
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, LogLinearHistogram] = {
+            phase: LogLinearHistogram() for phase in COMMAND_PHASES
+        }
+
+    def record(self, phases: Dict[str, int]) -> None:
+        for phase, value in phases.items():
+            self.phases[phase].record(value)
+
+    @classmethod
+    def merged(cls, timings: Iterable[CommandTimings]) -> CommandTimings:
+        merged = cls()
+
+        for timing in timings:
+            for phase, histogram in timing.phases.items():
+                merged.phases[phase].merge(histogram)
+
+        return merged
+
+
+class HttpMetrics:
+    """Request latency and error counts per upstream host, collected through an aiohttp trace config.
+
+    Latency is kept both as a lifetime :class:`Histogram` and a :class:`RollingHistogram`
+    of the last ``window`` seconds.
+    """
+
+    def __init__(self, *, window: float = 300) -> None:
+        self.window = window
+        self.latency: Dict[str, Histogram] = {}
+        self.recent: Dict[str, RollingHistogram] = {}
+        self.errors: Dict[str, int] = {}
+
+    def observe(self, host: str, nanoseconds: int) -> None:
+        histogram = self.latency.get(host)
+
+        if histogram is None:
+            histogram = self.latency[host] = Histogram()
+            self.recent[host] = RollingHistogram(self.window)
+
+        histogram.observe(nanoseconds / 1e9)
+        self.recent[host].record(nanoseconds)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter_ns()
+
+        async def on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams):
+            self.observe(params.url.host or "", time.perf_counter_ns() - ctx.start)
+
+        async def on_request_exception(
+            session, ctx, params: aiohttp.TraceRequestExceptionParams
+        ):
+            host = params.url.host or ""
+            self.errors[host] = self.errors.get(host, 0) + 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
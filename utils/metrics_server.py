@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from .http_pools import HttpPool
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional
+
+    from .bot import Bot
+    from .metrics import Histogram, LogLinearHistogram
+
+__all__ = ("MetricsServer",)
+
+BREAKER_STATES = ("closed", "half_open", "open")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Builds a Prometheus text exposition."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def metric(self, name: str, type: str, help: str) -> None:
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {type}")
+
+    def sample(
+        self, name: str, value: float, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.lines.append(f"{name}{_labels(labels or {})} {_number(value)}")
+
+    def histogram(
+        self, name: str, histogram: Histogram, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        labels = labels or {}
+
+        for bound, count in histogram.cumulative():
+            self.sample(f"{name}_bucket", count, {**labels, "le": _number(bound)})
+
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def summary(
+        self,
+        name: str,
+        histogram: LogLinearHistogram,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        labels = labels or {}
+
+        for quantile in (0.5, 0.95, 0.99):
+            self.sample(
+                name,
+                histogram.percentile(quantile * 100) / 1e9,
+                {**labels, "quantile": str(quantile)},
+            )
+
+        self.sample(f"{name}_sum", histogram.sum / 1e9, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """Serves the bot's internal metrics on ``/metrics`` in the Prometheus text format.
+
+    Configured by the ``[bot.metrics]`` table in ``config.toml``, with ``enabled``,
+    ``host`` (defaults to localhost) and ``port``.
+    """
+
+    def __init__(self, bot: Bot, *, host: str = "127.0.0.1", port: int = 9100):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+
+        # started as a task, so nothing else would see this fail, e.g. when the port is in use.
+        try:
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except Exception:
+            self.logger.exception(
+                "couldn't serve metrics on http://%s:%d/metrics", self.host, self.port
+            )
+            await self.close()
+            return
+
+        self.logger.info(
+            "serving metrics on http://%s:%d/metrics", self.host, self.port
+        )
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    def render(self) -> str:
+        """Collects every metric. This only reads counters the bot already keeps, so it's cheap."""
+        out = Exposition()
+        bot = self.bot
+
+        out.metric(
+            "discord_gateway_events_total", "counter", "Gateway events received."
+        )
+        for event, counter in getattr(bot, "socket_stats", ()):
+            out.sample("discord_gateway_events_total", counter.total, {"event": event})
+
+        out.metric(
+            "discord_ws_latency_seconds", "gauge", "Websocket heartbeat latency."
+        )
+        latency = bot.latency
+        out.sample(
+            "discord_ws_latency_seconds", latency if math.isfinite(latency) else 0
+        )
+
+        out.metric(
+            "event_loop_lag_seconds",
+            "summary",
+            "Event loop lag over the last 5 minutes.",
+        )
+        out.summary("event_loop_lag_seconds", bot.watchdog.lag.snapshot())
+
+        out.metric(
+            "event_loop_blocked_total",
+            "counter",
+            "Times the loop was blocked past the threshold.",
+        )
+        out.sample("event_loop_blocked_total", bot.watchdog.blocked)
+
+        out.metric("bot_guilds", "gauge", "Guilds the bot is in.")
+        out.sample("bot_guilds", len(bot.guilds))
+
+        out.metric(
+            "bot_command_latency_seconds",
+            "summary",
+            "Command invocation latency, by phase.",
+        )
+        for command, timings in bot.command_latency.items():
+            for phase, histogram in timings.phases.items():
+                # e.g. subcommands never record a converters phase.
+                if not histogram.count:
+                    continue
+
+                out.summary(
+                    "bot_command_latency_seconds",
+                    histogram,
+                    {"command": command, "phase": phase},
+                )
+
+        out.metric(
+            "bot_command_errors_total", "counter", "Commands that raised an error."
+        )
+        for command, count in bot.command_errors.items():
+            out.sample("bot_command_errors_total", count, {"command": command})
+
+        out.metric(
+            "upstream_request_latency_seconds",
+            "histogram",
+            "Outgoing HTTP request latency per host.",
+        )
+        for host, histogram in bot.http_metrics.latency.items():
+            out.histogram("upstream_request_latency_seconds", histogram, {"host": host})
+
+        out.metric(
+            "upstream_request_errors_total",
+            "counter",
+            "Outgoing HTTP requests that failed.",
+        )
+        for host, count in bot.http_metrics.errors.items():
+            out.sample("upstream_request_errors_total", count, {"host": host})
+
+        out.metric("cache_requests_total", "counter", "Cache lookups by result.")
+        for name, cache in bot.caches.items():
+            stats = cache.stats
+            for result in ("hits", "misses", "coalesced", "stale"):
+                out.sample(
+                    "cache_requests_total",
+                    getattr(stats, result),
+                    {"cache": name, "result": result},
+                )
+
+        out.metric(
+            "cache_disk_hits_total",
+            "counter",
+            "Cache misses that were found in the persistent store.",
+        )
+        for name, cache in bot.caches.items():
+            out.sample("cache_disk_hits_total", cache.stats.disk_hits, {"cache": name})
+
+        out.metric("cache_hit_ratio", "gauge", "Cache hit ratio.")
+        for name, cache in bot.caches.items():
+            out.sample("cache_hit_ratio", cache.stats.hit_ratio, {"cache": name})
+
+        out.metric("cache_entries", "gauge", "Entries held in memory by a cache.")
+        for name, cache in bot.caches.items():
+            out.sample("cache_entries", len(cache), {"cache": name})
+
+        handler = bot.webhook_logger
+        out.metric("webhook_logger_backlog", "gauge", "Log records waiting to be sent.")
+        out.sample("webhook_logger_backlog", handler.backlog)
+
+        out.metric("webhook_logger_records_total", "counter", "Log records by outcome.")
+        for outcome in (
+            "records",
+            "sent",
+            "dropped",
+            "collapsed",
+            "spooled",
+            "failures",
+        ):
+            out.sample(
+                "webhook_logger_records_total",
+                getattr(handler.stats, outcome),
+                {"outcome": outcome},
+            )
+
+        out.metric(
+            "circuit_breaker_state",
+            "gauge",
+            "Circuit breaker state: 0 closed, 1 half open, 2 open.",
+        )
+        for name, breaker in bot.breakers.items():
+            out.sample(
+                "circuit_breaker_state",
+                BREAKER_STATES.index(breaker.state),
+                {"upstream": name},
+            )
+
+        out.metric(
+            "circuit_breaker_trips_total", "counter", "Times a circuit breaker opened."
+        )
+        for name, breaker in bot.breakers.items():
+            out.sample("circuit_breaker_trips_total", breaker.trips, {"upstream": name})
+
+        out.metric(
+            "circuit_breaker_rejected_total",
+            "counter",
+            "Requests refused by an open circuit breaker.",
+        )
+        for name, breaker in bot.breakers.items():
+            out.sample(
+                "circuit_breaker_rejected_total", breaker.rejected, {"upstream": name}
+            )
+
+        out.metric("hedged_requests_total", "counter", "Hedgeable requests by outcome.")
+        for name, endpoints in bot.hedges.items():
+            for endpoint, stats in endpoints.items():
+                for result in ("requests", "hedged", "wins"):
+                    out.sample(
+                        "hedged_requests_total",
+                        getattr(stats, result),
+                        {"upstream": name, "endpoint": endpoint, "result": result},
+                    )
+
+        out.metric("http_pool_connections", "gauge", "Connections in a pool, by state.")
+        for name, pool in bot.pools:
+            out.sample(
+                "http_pool_connections", pool.active, {"pool": name, "state": "active"}
+            )
+            out.sample(
+                "http_pool_connections", pool.idle, {"pool": name, "state": "idle"}
+            )
+
+        out.metric(
+            "http_pool_waiting", "gauge", "Requests waiting for a free connection."
+        )
+        # connector only pools, like discord's, aren't traced.
+        for name, pool in bot.pools:
+            if isinstance(pool, HttpPool):
+                out.sample("http_pool_waiting", pool.waiting, {"pool": name})
+
+        out.metric(
+            "http_pool_connect_seconds",
+            "summary",
+            "Time to open a new connection over the last 5 minutes.",
+        )
+        for name, pool in bot.pools:
+            if isinstance(pool, HttpPool):
+                out.summary(
+                    "http_pool_connect_seconds",
+                    pool.connect_time.snapshot(),
+                    {"pool": name},
+                )
+
+        out.metric("ratelimit_waiting", "gauge", "Requests waiting on a rate limiter.")
+        for name, bucket in bot.ratelimits.buckets.items():
+            out.sample("ratelimit_waiting", bucket.waiting, {"upstream": name})
+
+        return out.render()
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import math
 from typing import TYPE_CHECKING
 
 import discord
@@ -7,12 +10,136 @@ from discord.ext import commands, menus
 from .constants import Embed
 
 if TYPE_CHECKING:
-    from typing import Optional, List, Union
+    from typing import (
+        Any,
+        AsyncIterable,
+        AsyncIterator,
+        Dict,
+        Iterable,
+        Optional,
+        List,
+        Union,
+    )
 
     from discord.ext.menus.views import ViewMenuPages
 
+__all__ = ("StreamPageSource", "FormatList")
 
-class FormatList(menus.ListPageSource):
+
+async def _flatten(chunks: AsyncIterable[Iterable[Any]]) -> AsyncIterator[Any]:
+    async for chunk in chunks:
+        for entry in chunk:
+            yield entry
+
+
+class StreamPageSource(menus.AsyncIteratorPageSource):
+    """A page source over entries that arrive in chunks, such as pages of an API.
+
+    ``entries`` is either a list, or an async iterable yielding lists of entries. The first
+    page is shown as soon as enough entries arrived for it, and the next page is fetched in
+    the background while the current one is being read. Rendered pages are kept, so going
+    back doesn't render them again.
+
+    Subclasses implement :meth:`render_page` instead of :meth:`format_page`.
+    """
+
+    def __init__(
+        self,
+        entries: Union[List[Any], AsyncIterable[Iterable[Any]]],
+        *,
+        per_page: int,
+    ):
+        if isinstance(entries, list):
+            super().__init__(_flatten(()), per_page=per_page)  # type: ignore
+            self._cache = entries
+            self._exhausted = True
+        else:
+            super().__init__(_flatten(entries), per_page=per_page)
+
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self._prefetch: Optional[asyncio.Task[None]] = None
+        self._error: Optional[BaseException] = None
+        self._rendered: Dict[int, Any] = {}
+
+    async def _iterate(self, n: int) -> None:
+        # the iterator can't be advanced by the prefetch and a page at the same time.
+        async with self._lock:
+            if self._error is not None:
+                raise self._error
+
+            if self._exhausted:
+                return
+
+            try:
+                await super()._iterate(n)
+            except Exception as e:
+                self._error = e
+                raise
+
+    def is_paginating(self) -> bool:
+        return len(self._cache) > self.per_page
+
+    def get_max_pages(self) -> Optional[int]:
+        """The number of pages, or ``None`` while more entries may still arrive."""
+        if not self._exhausted:
+            return None
+        return max(math.ceil(len(self._cache) / self.per_page), 1)
+
+    async def get_page(self, page_number: int):
+        page = await super().get_page(page_number)
+        self.prefetch(page_number + 1)
+        return page
+
+    def prefetch(self, page_number: int) -> None:
+        """Starts fetching the entries of ``page_number`` in the background, if they aren't already."""
+        wanted = (page_number + 1) * self.per_page + 1
+
+        if self._exhausted or len(self._cache) >= wanted:
+            return
+
+        if self._prefetch is not None and not self._prefetch.done():
+            return
+
+        self._prefetch = asyncio.create_task(self._fetch_ahead(wanted))
+
+    async def _fetch_ahead(self, wanted: int) -> None:
+        try:
+            await self._iterate(wanted - len(self._cache))
+        except Exception:
+            # raised again when the page is asked for.
+            self.logger.debug("prefetching entries failed", exc_info=True)
+
+    def page_footer(self, menu: ViewMenuPages) -> Optional[str]:
+        max_pages = self.get_max_pages()
+
+        if max_pages is None:
+            return f"Page {menu.current_page+1}/?"
+        if max_pages > 1:
+            return f"Page {menu.current_page+1}/{max_pages}"
+        return None
+
+    async def format_page(self, menu: ViewMenuPages, entries):
+        page = self._rendered.get(menu.current_page)
+
+        if page is None:
+            page = self._rendered[menu.current_page] = await self.render_page(
+                menu, entries
+            )
+
+        footer = self.page_footer(menu)
+
+        # the total may have become known since the page was rendered.
+        if isinstance(page, discord.Embed) and footer is not None:
+            page.set_footer(text=footer)
+
+        return page
+
+    async def render_page(self, menu: ViewMenuPages, entries) -> Any:
+        raise NotImplementedError
+
+
+class FormatList(StreamPageSource):
     """Formats a list like
     ```
     1. A
@@ -29,17 +156,18 @@ class FormatList(menus.ListPageSource):
     """
 
     def __init__(
-        self, entries, *, per_page: Optional[int] = 5, enumerate: bool = False
+        self,
+        entries: Union[List[Any], AsyncIterable[Iterable[Any]]],
+        *,
+        per_page: int = 5,
+        enumerate: bool = False,
     ):
         super().__init__(entries, per_page=per_page)
         self.enumerate = enumerate
 
-    async def format_page(self, menu: ViewMenuPages, entries: Union[List[str], str]):
+    async def render_page(self, menu: ViewMenuPages, entries: Union[List[str], str]):
         embed = Embed(description="")
 
-        if self.get_max_pages() > 1:
-            embed.set_footer(text=f"Page {menu.current_page+1}/{self.get_max_pages()}")
-
         if isinstance(entries, str):
             embed.description = entries
             return embed
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Optional, Set, Tuple
+
+__all__ = ("PersistentCache",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+
+class PersistentCache:
+    """A small SQLite backed key value store, used to keep caches warm across restarts.
+
+    All disk access happens on a dedicated worker thread. Writes are buffered and flushed
+    in batches every ``flush_interval`` seconds (or once ``batch_size`` writes are pending),
+    so callers never wait on disk for a write. Deletes are buffered the same way, and hide
+    the stored value until they are flushed. The database is only opened on first use.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_entries: int = 10_000,
+        flush_interval: float = 5,
+        batch_size: int = 100,
+    ) -> None:
+        """Creates a new store.
+
+        Args:
+            path (str): The path of the SQLite database.
+            max_entries (int, optional): How many entries are kept before the least recently used
+                are evicted. Defaults to 10_000.
+            flush_interval (float, optional): How often pending writes are flushed, in seconds. Defaults to 5.
+            batch_size (int, optional): Flush early once this many writes are pending. Defaults to 100.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._touched: Set[Tuple[str, str]] = set()
+        self._deleted: Set[Tuple[str, str]] = set()
+        self._cleared: Set[str] = set()
+        self._flusher: Optional[asyncio.Task[None]] = None
+        self._wakeup = asyncio.Event()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Looks up a value, returning ``None`` if it isn't stored or has expired.
+
+        Args:
+            namespace (str): The namespace the key belongs to.
+            key (str): The key.
+
+        Returns:
+            Optional[Tuple[Any, float]]: The decoded value, and when it expires as a unix timestamp.
+        """
+        pending = self._pending.get((namespace, key))
+
+        if pending is not None:
+            raw, expires = pending
+        elif (namespace, key) in self._deleted or namespace in self._cleared:
+            return None
+        else:
+            row = await self._run(self._select, namespace, key)
+
+            if row is None:
+                return None
+
+            raw, expires = row
+
+        if expires <= time.time():
+            return None
+
+        self._touched.add((namespace, key))
+        self._start_flusher()
+        return json.loads(raw), expires
+
+    def _select(self, namespace: str, key: str) -> Optional[Tuple[str, float]]:
+        return (
+            self._connect()
+            .execute(
+                "SELECT value, expires FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            )
+            .fetchone()
+        )
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Schedules a value to be written. This never blocks.
+
+        Args:
+            namespace (str): The namespace the key belongs to.
+            key (str): The key.
+            value (Any): A json serializable value.
+            ttl (float): How long the value stays valid for, in seconds.
+        """
+        self._pending[(namespace, key)] = (json.dumps(value), time.time() + ttl)
+        self._deleted.discard((namespace, key))
+        self._schedule()
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Schedules a value to be deleted. This never blocks.
+
+        Args:
+            namespace (str): The namespace the key belongs to.
+            key (str): The key.
+        """
+        self._pending.pop((namespace, key), None)
+        self._touched.discard((namespace, key))
+        self._deleted.add((namespace, key))
+        self._schedule()
+
+    def clear(self, namespace: str) -> None:
+        """Schedules every value in ``namespace`` to be deleted. This never blocks.
+
+        Args:
+            namespace (str): The namespace to clear.
+        """
+        self._pending = {k: v for k, v in self._pending.items() if k[0] != namespace}
+        self._touched = {k for k in self._touched if k[0] != namespace}
+        self._deleted = {k for k in self._deleted if k[0] != namespace}
+        self._cleared.add(namespace)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._start_flusher()
+
+        if len(self._pending) + len(self._deleted) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                self.logger.exception("failed to flush the persistent cache")
+
+    async def flush(self) -> None:
+        """Writes every pending change to disk and evicts entries over the size cap."""
+        if not (self._pending or self._touched or self._deleted or self._cleared):
+            return
+
+        pending, self._pending = self._pending, {}
+        touched, self._touched = self._touched, set()
+        deleted, self._deleted = self._deleted, set()
+        cleared, self._cleared = self._cleared, set()
+        # queued on the same thread as reads, so nothing reads the old values in between.
+        await self._run(self._write, pending, touched, deleted, cleared)
+
+    def _write(
+        self,
+        pending: Dict[Tuple[str, str], Tuple[str, float]],
+        touched: Set[Tuple[str, str]],
+        deleted: Set[Tuple[str, str]],
+        cleared: Set[str],
+    ) -> None:
+        conn = self._connect()
+        now = time.time()
+
+        with conn:
+            # deletes go first, values set after a clear were kept in ``pending``.
+            conn.executemany(
+                "DELETE FROM cache WHERE namespace = ?", [(ns,) for ns in cleared]
+            )
+            conn.executemany(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", list(deleted)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                [
+                    (ns, key, raw, expires, now)
+                    for (ns, key), (raw, expires) in pending.items()
+                ],
+            )
+            conn.executemany(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                [(now, ns, key) for ns, key in touched],
+            )
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            conn.execute(
+                "DELETE FROM cache WHERE rowid IN "
+                "(SELECT rowid FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    async def close(self) -> None:
+        """Flushes any pending writes and closes the database."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+
+        await self.flush()
+
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+        self._executor.shutdown(wait=False)
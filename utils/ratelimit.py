@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from typing import Any, Deque, Dict, Hashable, Optional
+
+__all__ = ("TokenBucket", "RateLimits")
+
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "xivapi": {"rate": 10, "burst": 20},
+    "cards": {"rate": 2, "burst": 5},
+    "webhook": {"rate": 2, "burst": 5},
+}
+
+DEFAULT_HOSTS: Dict[str, str] = {
+    "xivapi.com": "xivapi",
+    "ffxiv-character-cards.herokuapp.com": "cards",
+    "discord.com": "webhook",
+}
+
+
+class TokenBucket:
+    """A token bucket that hands out tokens fairly between keys (e.g. guild ids).
+
+    When the bucket is empty, waiters are queued per key and served round robin,
+    so one busy guild can't starve the rest.
+    """
+
+    def __init__(self, name: str, *, rate: float, burst: int) -> None:
+        """Creates a new bucket.
+
+        Args:
+            name (str): The name of the upstream, used for logging.
+            rate (float): How many tokens are added per second.
+            burst (int): The maximum amount of tokens the bucket can hold.
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.logger = logging.getLogger(__name__)
+
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queues: OrderedDict[Hashable, Deque[asyncio.Future[None]]] = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def waiting(self) -> int:
+        """The amount of requests waiting for a token."""
+        return sum(len(q) for q in self._queues.values())
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    async def acquire(self, key: Hashable = None) -> None:
+        """Waits until a token is available and takes it.
+
+        Args:
+            key (Hashable, optional): What to queue fairly by, usually a guild id. Defaults to None.
+        """
+        now = self._refill()
+
+        if not self._queues and now >= self._paused_until and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+        await future
+
+    def defer(self, seconds: float) -> None:
+        """Stops handing out tokens for ``seconds``, e.g. because of a Retry-After header."""
+        until = time.monotonic() + seconds
+
+        if until > self._paused_until:
+            self.logger.warning(
+                "upstream `%s` asked us to back off for %.2fs", self.name, seconds
+            )
+            self._paused_until = until
+            self.tokens = 0
+            self._wakeup.set()
+
+    def _next_future(self) -> Optional[asyncio.Future[None]]:
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+
+            if not future.done():
+                return future
+
+        return None
+
+    async def _dispatch(self) -> None:
+        while self._queues:
+            now = self._refill()
+
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            elif self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+            else:
+                future = self._next_future()
+
+                if future is not None:
+                    self.tokens -= 1
+                    future.set_result(None)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+class RateLimits:
+    """The registry of :class:`TokenBucket`, one per upstream.
+
+    Limits are read from the ``[bot.ratelimits.<name>]`` tables in ``config.toml``,
+    with ``rate`` and ``burst`` keys.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        self.config = config or {}
+        self.hosts: Dict[str, str] = {**DEFAULT_HOSTS, **self.config.get("hosts", {})}
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def get(self, name: str) -> TokenBucket:
+        """Gets (or creates) the bucket for an upstream."""
+        bucket = self.buckets.get(name)
+
+        if bucket is None:
+            limits = {**DEFAULT_LIMITS.get(name, {}), **self.config.get(name, {})}
+            bucket = self.buckets[name] = TokenBucket(
+                name, rate=limits.get("rate", 1), burst=int(limits.get("burst", 1))
+            )
+
+        return bucket
+
+    def handle_retry_after(self, name: str, response: aiohttp.ClientResponse) -> None:
+        """Defers the bucket ``name`` if the response is a 429 with a Retry-After header."""
+        if response.status != 429:
+            return
+
+        try:
+            retry_after = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            retry_after = 1
+
+        self.get(name).defer(retry_after)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Builds a trace config that honours Retry-After for every known upstream host,
+        including ones we don't make requests to directly (like through pyxivapi)."""
+
+        async def on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams):
+            name = self.hosts.get(params.url.host or "")
+
+            if name is not None:
+                self.handle_retry_after(name, params.response)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
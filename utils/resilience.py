@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Awaitable, Callable, Optional, Set, TypeVar
+
+    T = TypeVar("T")
+
+__all__ = ("CircuitBreaker", "HedgeStats", "hedged")
+
+
+class CircuitBreaker:
+    """Stops sending requests to an upstream that keeps failing.
+
+    After ``failure_threshold`` failures in a row the breaker opens, and :meth:`allow` refuses
+    every request for ``reset_timeout`` seconds. It then half opens, letting a single probe
+    through: if that succeeds the breaker closes again, otherwise it stays open for another
+    ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    def __init__(
+        self, name: str, *, failure_threshold: int = 5, reset_timeout: float = 30
+    ) -> None:
+        """Creates a new, closed breaker.
+
+        Args:
+            name (str): The name of the upstream, used for logging.
+            failure_threshold (int, optional): How many failures in a row open the breaker. Defaults to 5.
+            reset_timeout (float, optional): How long the breaker stays open before probing, in seconds.
+                Defaults to 30.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._opened = 0.0
+        self._probe: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self._opened >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    @property
+    def retry_after(self) -> float:
+        """How long until the breaker half opens, in seconds."""
+        if self.state == self.CLOSED:
+            return 0
+        return max(self._opened + self.reset_timeout - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        """Whether a request may be made right now. Refused requests are counted."""
+        state = self.state
+
+        if state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+
+        # a probe that never reported back (e.g. it was cancelled) doesn't block forever.
+        if state == self.HALF_OPEN and (
+            self._probe is None or now - self._probe >= self.reset_timeout
+        ):
+            self._probe = now
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool) -> None:
+        """Records the outcome of a request."""
+        self._probe = None
+
+        if success:
+            if self.failures >= self.failure_threshold:
+                self.logger.info("%s recovered, closing the circuit", self.name)
+            self.failures = 0
+            return
+
+        self.failures += 1
+
+        if self.failures >= self.failure_threshold:
+            if self.failures == self.failure_threshold:
+                self.trips += 1
+                self.logger.warning(
+                    "%s failed %d times in a row, opening the circuit",
+                    self.name,
+                    self.failures,
+                )
+            self._opened = time.monotonic()
+
+
+class HedgeStats:
+    """How often requests were hedged, and how often the hedge answered first."""
+
+    __slots__ = ("requests", "hedged", "wins")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.hedged if self.hedged else 0.0
+
+
+async def hedged(
+    attempt: Callable[[], Awaitable[T]],
+    delay: float,
+    stats: Optional[HedgeStats] = None,
+) -> T:
+    """Runs ``attempt``, starting a second one if the first takes longer than ``delay`` seconds.
+
+    Whichever succeeds first wins and the other is cancelled. Only use this for idempotent requests.
+    """
+    stats = stats or HedgeStats()
+    stats.requests += 1
+
+    first = asyncio.ensure_future(attempt())
+    pending: Set[asyncio.Future[T]] = {first}
+
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+
+        if done:
+            return first.result()
+
+        stats.hedged += 1
+        pending.add(asyncio.ensure_future(attempt()))
+        error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        stats.wins += 1
+                    return future.result()
+
+                error = future.exception()
+
+        assert error is not None
+        raise error
+    finally:
+        for future in pending:
+            future.cancel()
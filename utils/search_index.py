@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import re
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterator, List, Set, Tuple
+
+__all__ = ("SearchIndex",)
+
+T = TypeVar("T")
+
+TOKEN = re.compile(r"[^\W_]+")
+MIN_PREFIX = 2
+MAX_PREFIX = 8
+
+
+def tokenize(text: str) -> Iterator[str]:
+    return (m.group() for m in TOKEN.finditer(text.casefold()))
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex(Generic[T]):
+    """A fuzzy keyword index over items.
+
+    Every word of an item's text is a term. Terms are found through an exact lookup,
+    a prefix table, and a trigram table for typos, so a search only touches the
+    postings of the terms it matches instead of every item. Terms sharing a trigram
+    with the query word are then scored by how closely they spell it.
+    """
+
+    def __init__(self, *, threshold: float = 0.75) -> None:
+        """Creates an empty index.
+
+        Args:
+            threshold (float, optional): The minimum similarity (0-1) for a term to match a
+                misspelled query word. Defaults to 0.75.
+        """
+        self.threshold = threshold
+        self.items: List[T] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: T, *fields: Tuple[str, float]) -> None:
+        """Adds an item, searchable by the words of each ``(text, weight)`` field."""
+        item_id = len(self.items)
+        self.items.append(item)
+
+        for text, weight in fields:
+            for term in tokenize(text):
+                self._add_term(term, item_id, weight)
+
+    def _add_term(self, term: str, item_id: int, weight: float) -> None:
+        postings = self._postings.get(term)
+
+        if postings is None:
+            postings = self._postings[term] = {}
+
+            for gram in trigrams(term):
+                self._trigrams.setdefault(gram, set()).add(term)
+
+            for length in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1):
+                self._prefixes.setdefault(term[:length], set()).add(term)
+
+        postings[item_id] = max(postings.get(item_id, 0), weight)
+
+    def _similar_terms(self, word: str) -> Dict[str, float]:
+        """Finds the terms matching a query word, along with how well they match (0-1)."""
+        matches: Dict[str, float] = {}
+
+        if word in self._postings:
+            matches[word] = 1.0
+
+        if len(word) >= MIN_PREFIX:
+            for term in self._prefixes.get(word[:MAX_PREFIX], ()):
+                if term.startswith(word):
+                    matches.setdefault(term, 0.8 + 0.2 * len(word) / len(term))
+
+        candidates: Set[str] = set()
+
+        for gram in trigrams(word):
+            candidates.update(self._trigrams.get(gram, ()))
+
+        matcher = SequenceMatcher(b=word)
+
+        for term in candidates - matches.keys():
+            matcher.set_seq1(term)
+
+            if matcher.real_quick_ratio() < self.threshold:
+                continue
+
+            similarity = matcher.ratio()
+
+            if similarity >= self.threshold:
+                matches[term] = similarity * 0.8
+
+        return matches
+
+    def search(self, query: str, *, limit: int = 10) -> List[Tuple[T, float]]:
+        """Returns up to ``limit`` items matching ``query``, best first, along with their score."""
+        scores: Dict[int, float] = {}
+
+        for word in tokenize(query):
+            for term, similarity in self._similar_terms(word).items():
+                for item_id, weight in self._postings[term].items():
+                    scores[item_id] = scores.get(item_id, 0) + similarity * weight
+
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [(self.items[item_id], score) for item_id, score in best]
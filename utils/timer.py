@@ -1,17 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
 import time
+from collections import deque
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from typing import Any, Deque, Dict, List, Optional
+
+__all__ = ("Timer", "Tracer", "tracer")
+
+_current: ContextVar[Optional[Timer]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects finished :class:`Timer` spans into an in-memory ring, and optionally a json-lines file.
+
+    While disabled, timers only record their start and end time.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        capacity: int = 2000,
+        path: Optional[str] = None,
+        flush_size: int = 100,
+    ) -> None:
+        self.enabled = enabled
+        self.path = path
+        self.flush_size = flush_size
+        self.spans: Deque[Timer] = deque(maxlen=capacity)
+        self._lines: List[str] = []
+
+    def configure(
+        self,
+        *,
+        enabled: bool = False,
+        capacity: int = 2000,
+        path: Optional[str] = None,
+        flush_size: int = 100,
+    ) -> None:
+        """Reconfigures the tracer, e.g. from the ``[bot.tracing]`` table in ``config.toml``."""
+        self.enabled = enabled
+        self.path = path
+        self.flush_size = flush_size
+        self.spans = deque(self.spans, maxlen=capacity)
+
+    def export(self, span: Timer) -> None:
+        self.spans.append(span)
+
+        if self.path is None:
+            return
+
+        self._lines.append(json.dumps(span.to_dict()))
+
+        if len(self._lines) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered spans to the file, off the event loop."""
+        if not self._lines or self.path is None:
+            return
+
+        lines, self._lines = self._lines, []
+        asyncio.get_running_loop().run_in_executor(None, self._write, self.path, lines)
+
+    @staticmethod
+    def _write(path: str, lines: List[str]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def start_span(self, name: str, **attributes: Any) -> Timer:
+        """Starts a span that isn't made the current span, for callbacks that
+        can't wrap what they're timing in a ``with`` block. Call :meth:`Timer.finish` to end it.
+        """
+        span = Timer(name, **attributes)
+        span._begin()
+        return span
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Builds a trace config that records a span for every request made with the session."""
+
+        async def on_request_start(
+            session, ctx, params: aiohttp.TraceRequestStartParams
+        ):
+            if self.enabled:
+                ctx.span = self.start_span(
+                    f"http {params.method}",
+                    host=params.url.host,
+                    path=params.url.path,
+                )
+
+        async def on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams):
+            span: Optional[Timer] = getattr(ctx, "span", None)
+
+            if span is not None:
+                span.attributes["status"] = params.response.status
+                span.finish()
+
+        async def on_request_exception(
+            session, ctx, params: aiohttp.TraceRequestExceptionParams
+        ):
+            span: Optional[Timer] = getattr(ctx, "span", None)
+
+            if span is not None:
+                span.attributes["error"] = type(params.exception).__name__
+                span.finish()
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+
+tracer = Tracer()
 
 
 class Timer:
-    start: float
-    end: float
+    """Times a block of code, and doubles as a span for :data:`tracer`.
+
+    Timers nest: a timer entered inside another (including across awaits and in tasks
+    created inside it) becomes its child.
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "_token",
+    )
+
+    def __init__(self, name: str = "timer", **attributes: Any) -> None:
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.parent_id: Optional[int] = None
+        self.end_ns = 0
+        self._token = None
+
+    def _begin(self) -> None:
+        parent = _current.get()
+
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        else:
+            self.trace_id = random.getrandbits(64)
+
+        self.span_id = random.getrandbits(64)
+        self.start_ns = time.perf_counter_ns()
 
-    def __enter__(self):
-        self.start = time.time()
+    def finish(self) -> None:
+        self.end_ns = time.perf_counter_ns()
+        tracer.export(self)
+
+    def __enter__(self) -> Timer:
+        if not tracer.enabled:
+            self.start_ns = time.perf_counter_ns()
+            return self
+
+        self._begin()
+        self._token = _current.set(self)
         return self
 
-    def __exit__(self, exc_type, exc_value, traceback):
-        self.end = time.time()
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._token is None:
+            self.end_ns = time.perf_counter_ns()
+            return
+
+        _current.reset(self._token)
+        self._token = None
+
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+
+        self.finish()
 
     @property
-    def elapsed(self) -> int:
-        return int(self.end - self.start)
+    def start(self) -> float:
+        return self.start_ns / 1e9
+
+    @property
+    def end(self) -> float:
+        return self.end_ns / 1e9
+
+    @property
+    def elapsed(self) -> float:
+        """How long the timer ran for, in seconds."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": f"{self.trace_id:016x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "start_ns": self.start_ns,
+            "duration_ns": self.end_ns - self.start_ns,
+            "attributes": self.attributes,
+        }
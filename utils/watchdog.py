@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING
+
+from .metrics import RollingHistogram
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+__all__ = ("LoopWatchdog",)
+
+
+class LoopWatchdog:
+    """Measures how late the event loop runs callbacks, and catches what is blocking it.
+
+    A coroutine sleeps for ``interval`` and records how much later than that it woke up.
+    A helper thread watches for it falling silent, and if the loop is stuck for longer than
+    ``threshold`` it logs the stack of whatever the loop thread is running at that moment.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.25,
+        threshold: float = 0.5,
+        window: float = 300,
+    ) -> None:
+        """Creates a new watchdog.
+
+        Args:
+            interval (float, optional): How often the loop is sampled, in seconds. Defaults to 0.25.
+            threshold (float, optional): How long the loop can be blocked before its stack is captured,
+                in seconds. Defaults to 0.5.
+            window (float, optional): How many seconds of lag samples are kept. Defaults to 300.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = RollingHistogram(window)
+        self.blocked = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts watching the running loop. Must be called from the loop's thread."""
+        if self._task is not None and not self._task.done():
+            return
+
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._monitor())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _monitor(self) -> None:
+        while True:
+            start = time.perf_counter_ns()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            lag = time.perf_counter_ns() - start - int(self.interval * 1e9)
+            self.lag.record(lag)
+
+    def _watch(self) -> None:
+        reported = 0.0
+
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+
+            if stalled < self.threshold or beat == reported:
+                continue
+
+            # only report once per stall.
+            reported = beat
+            self.blocked += 1
+            frame = sys._current_frames().get(self._loop_thread)  # type: ignore
+            stack = "".join(traceback.format_stack(frame)) if frame else "unknown"
+
+            self.logger.warning(
+                "event loop blocked for over %.2fs, currently running:\n%s",
+                stalled,
+                stack,
+            )
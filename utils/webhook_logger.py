@@ -3,14 +3,94 @@ from io import BytesIO
 
 import logging
 import asyncio
-from typing import TYPE_CHECKING
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, TypedDict
 
+import aiohttp
 import discord
 from .constants import Embed
 
-
 if TYPE_CHECKING:
-    from typing import Optional
+    from typing import Any, Deque, Dict, Optional, List, Tuple, Union
+
+    from .ratelimit import TokenBucket
+
+    Fingerprint = Tuple[str, int, str, Any]
+
+# https://discord.com/developers/docs/resources/channel#embed-object-embed-limits
+MAX_EMBEDS = 10
+MAX_FILES = 10
+MAX_MESSAGE_CHARS = 6000
+MAX_DESCRIPTION_CHARS = 4096
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_lowest", "sample")
+
+
+class LogPayload(TypedDict):
+    """A formatted record, ready to be sent or spooled to disk."""
+
+    name: str
+    levelname: str
+    levelno: int
+    text: str
+
+
+class WebhookLoggerStats:
+    """Throughput counters for a :class:`WebhookLogger`."""
+
+    __slots__ = (
+        "records",
+        "sent",
+        "messages",
+        "dropped",
+        "collapsed",
+        "retries",
+        "failures",
+        "spooled",
+        "replayed",
+        "restarts",
+    )
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.sent = 0
+        self.messages = 0
+        self.dropped = 0
+        self.collapsed = 0
+        self.retries = 0
+        self.failures = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.restarts = 0
+
+
+class QueuedRecord:
+    """A formatted record waiting to be sent, along with how many identical records it stands for."""
+
+    __slots__ = ("payload", "count", "queued")
+
+    def __init__(self, payload: LogPayload, count: int = 1) -> None:
+        self.payload = payload
+        self.count = count
+        self.queued = True
+
+
+class CollapseWindow:
+    """Tracks identical records seen within the collapse window."""
+
+    __slots__ = ("start", "entry", "suppressed", "last")
+
+    def __init__(self, entry: QueuedRecord) -> None:
+        self.start = time.monotonic()
+        self.entry = entry
+        self.suppressed = 0
+        self.last = entry.payload
 
 
 class WebhookLogger(logging.Handler):
@@ -27,47 +107,587 @@ class WebhookLogger(logging.Handler):
         *,
         loop: Optional[asyncio.AbstractEventLoop] = None,
         webhook: discord.Webhook,
+        limiter: Optional[TokenBucket] = None,
+        batch_size: int = 50,
+        batch_chars: int = 30_000,
+        flush_interval: float = 2,
+        max_backlog: int = 1000,
+        overflow: str = "drop_oldest",
+        collapse_window: float = 60,
+        report_interval: float = 60,
+        spool_path: Optional[str] = "webhook_spool.jsonl",
+        max_spool_bytes: int = 10_000_000,
+        max_retries: int = 5,
+        retry_backoff: float = 1,
+        max_retry_backoff: float = 60,
     ) -> None:
+        """Creates a new handler.
+
+        Records are batched, and a batch is flushed once ``batch_size`` records or
+        ``batch_chars`` characters are queued, or ``flush_interval`` seconds after the
+        first record, whichever comes first.
+
+        At most ``max_backlog`` records are kept waiting; past that ``overflow`` decides
+        what is dropped. ``drop_oldest`` drops the oldest record, ``drop_lowest`` drops
+        the lowest level record and ``sample`` keeps a uniform sample of the overflow.
+        Identical records (same logger, level, message template and exception type)
+        within ``collapse_window`` seconds are sent once along with their count.
+
+        A failed send is retried up to ``max_retries`` times with exponential backoff.
+        If it still fails, the batch is appended to ``spool_path`` and replayed whenever
+        the sender (re)starts. The sender is restarted if it ever crashes.
+
+        Records logged with ``extra={"webhook": False}`` are never sent.
+
+        :meth:`emit` only puts the record on a thread-safe queue, so it is cheap and can be
+        called from any thread. Records are formatted on a separate listener thread, then
+        handed to the event loop for batching and delivery.
+
+        Args:
+            loop (Optional[asyncio.AbstractEventLoop], optional): The loop to run on. Defaults to None.
+            webhook (discord.Webhook): The webhook to send records to.
+            limiter (Optional[TokenBucket], optional): The rate limiter every message goes through. Defaults to None.
+            batch_size (int, optional): The maximum records per batch. Defaults to 50.
+            batch_chars (int, optional): The maximum formatted characters per batch. Defaults to 30_000.
+            flush_interval (float, optional): The longest a record waits before being sent, in seconds. Defaults to 2.
+            max_backlog (int, optional): The maximum amount of records waiting to be sent. Defaults to 1000.
+            overflow (str, optional): What to drop once the backlog is full. Defaults to "drop_oldest".
+            collapse_window (float, optional): How long identical records are collapsed for, in seconds.
+                Defaults to 60.
+            report_interval (float, optional): How often dropped / collapsed counts are reported, in seconds.
+                Defaults to 60.
+            spool_path (Optional[str], optional): Where undeliverable records are spooled. ``None`` disables
+                spooling. Defaults to "webhook_spool.jsonl".
+            max_spool_bytes (int, optional): The maximum size of the spool file. Defaults to 10_000_000.
+            max_retries (int, optional): How many times a message is tried before being spooled. Defaults to 5.
+            retry_backoff (float, optional): The delay before the first retry, in seconds. Defaults to 1.
+            max_retry_backoff (float, optional): The maximum delay between retries, in seconds. Defaults to 60.
+
+        Raises:
+            ValueError: ``overflow`` isn't a valid policy.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, not {overflow!r}"
+            )
+
         super().__init__()
         self.hook = webhook
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.overflow = overflow
+        self.collapse_window = collapse_window
+        self.report_interval = report_interval
+        self.spool_path = spool_path
+        self.max_spool_bytes = max_spool_bytes
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.stats = WebhookLoggerStats()
+        self.logger = logging.getLogger(__name__)
         self.loop = loop or asyncio.get_event_loop()
-        self._queue = asyncio.Queue[logging.LogRecord]()
-        self.loop.create_task(self.sender())
+
+        self._inbox: queue.SimpleQueue[Optional[logging.LogRecord]] = (
+            queue.SimpleQueue()
+        )
+        self._buffer: Deque[QueuedRecord] = deque()
+        self._not_empty = asyncio.Event()
+        self._windows: Dict[Fingerprint, CollapseWindow] = {}
+        self._overflow_seen = 0
+        # the batch being collected, then its messages as they're sent, for shutdown.
+        self._collecting: List[LogPayload] = []
+        self._outgoing: List[List[LogPayload]] = []
+
+        self._listener = threading.Thread(
+            target=self.listen, name="webhook-logger", daemon=True
+        )
+        self._listener.start()
+        self._tasks = [
+            self.loop.create_task(self.supervise()),
+            self.loop.create_task(self.reporter()),
+        ]
+
+    @property
+    def backlog(self) -> int:
+        """The amount of records waiting to be sent."""
+        return len(self._buffer)
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> Fingerprint:
+        exc_type = record.exc_info[0] if record.exc_info else None
+        return (record.name, record.levelno, str(record.msg), exc_type)
 
     def emit(self, record: logging.LogRecord) -> None:
-        self._queue.put_nowait(record)
+        if getattr(record, "webhook", True) is not False:
+            self._inbox.put_nowait(record)
 
-    async def sender(self) -> None:
+    def close(self) -> None:
+        self._inbox.put_nowait(None)
+        super().close()
+
+    def listen(self) -> None:
+        """Formats records off the event loop, then hands them to it. Runs on the listener thread."""
         while True:
-            embeds: list[discord.Embed] = []
-            files: list[discord.File] = []
-
-            for record in [
-                r
-                for r in await asyncio.gather(
-                    *(
-                        asyncio.wait_for(self._queue.get(), timeout=10)
-                        for _ in range(10)
-                    ),
-                    return_exceptions=True,
+            record = self._inbox.get()
+
+            if record is None:
+                return
+
+            payload = self.build_payload(record)
+
+            if payload is None:
+                continue
+
+            try:
+                self.loop.call_soon_threadsafe(
+                    self._accept, self.fingerprint(record), payload
                 )
-                if isinstance(r, logging.LogRecord)
-            ]:
+            except RuntimeError:
+                # the loop was closed, so there's nothing left to deliver with.
+                return
+
+    def _accept(self, key: Fingerprint, payload: LogPayload) -> None:
+        self.stats.records += 1
+        window = self._windows.get(key)
+
+        if (
+            window is not None
+            and time.monotonic() - window.start < self.collapse_window
+        ):
+            self.stats.collapsed += 1
+
+            if window.entry.queued:
+                window.entry.count += 1
+            else:
+                # already sent, so it's reported once the window closes.
+                window.suppressed += 1
+                window.last = payload
+            return
+
+        entry = QueuedRecord(payload)
+        self._windows[key] = CollapseWindow(entry)
+        self._push(entry)
+
+    def _push(self, entry: QueuedRecord) -> None:
+        if len(self._buffer) < self.max_backlog:
+            self._buffer.append(entry)
+            self._not_empty.set()
+            return
+
+        self.stats.dropped += 1
+
+        if self.overflow == "drop_oldest":
+            self._buffer.popleft().queued = False
+            self._buffer.append(entry)
+
+        elif self.overflow == "drop_lowest":
+            lowest = min(self._buffer, key=lambda e: e.payload["levelno"])
+
+            if entry.payload["levelno"] < lowest.payload["levelno"]:
+                entry.queued = False
+                return
+
+            self._buffer.remove(lowest)
+            lowest.queued = False
+            self._buffer.append(entry)
+
+        else:
+            # reservoir sampling, so every record since the backlog filled up
+            # has the same chance of being kept.
+            self._overflow_seen += 1
+            index = random.randrange(self.max_backlog + self._overflow_seen)
+
+            if index >= self.max_backlog:
+                entry.queued = False
+                return
+
+            self._buffer[index].queued = False
+            self._buffer[index] = entry
+
+    async def _get(self, timeout: Optional[float] = None) -> QueuedRecord:
+        while not self._buffer:
+            self._not_empty.clear()
+            await asyncio.wait_for(self._not_empty.wait(), timeout)
+
+        entry = self._buffer.popleft()
+        entry.queued = False
 
-                formatted = self.format(record)
+        if not self._buffer:
+            self._overflow_seen = 0
 
-                if len(formatted) >= 4098:
-                    file = discord.File(
-                        BytesIO(formatted.encode()),
-                        filename=f"{record.name}-{record.levelname}.txt",
+        return entry
+
+    def build_payload(self, record: logging.LogRecord) -> Optional[LogPayload]:
+        """Formats a record, returning ``None`` if formatting fails."""
+        try:
+            formatted = discord.utils.escape_markdown(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return None
+
+        return LogPayload(
+            name=record.name,
+            levelname=record.levelname,
+            levelno=record.levelno,
+            text=formatted,
+        )
+
+    @staticmethod
+    def is_file(payload: LogPayload) -> bool:
+        return len(payload["text"]) > MAX_DESCRIPTION_CHARS
+
+    def build_message(
+        self, payloads: List[LogPayload]
+    ) -> Tuple[List[discord.Embed], List[discord.File]]:
+        """Builds the embeds and files for a message, sending long records as files."""
+        embeds: List[discord.Embed] = []
+        files: List[discord.File] = []
+
+        for payload in payloads:
+            if self.is_file(payload):
+                files.append(
+                    discord.File(
+                        BytesIO(payload["text"].encode()),
+                        filename=f"{payload['name']}-{payload['levelname']}.txt",
                     )
-                    files.append(file)
+                )
+            else:
+                embeds.append(
+                    Embed(
+                        description=payload["text"],
+                        color=self.COLORS.get(payload["levelno"]),
+                    )
+                )
+
+        return embeds, files
+
+    def _take_payload(self, queued: QueuedRecord) -> LogPayload:
+        if queued.count == 1:
+            return queued.payload
+
+        payload = LogPayload(**queued.payload)
+        payload["text"] += f"\n(×{queued.count} in last {self.collapse_window:.0f}s)"
+        return payload
+
+    async def collect(self) -> List[LogPayload]:
+        """Waits for the next batch of records."""
+        payloads = self._collecting = [self._take_payload(await self._get())]
+        chars = len(payloads[0]["text"])
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(payloads) < self.batch_size and chars < self.batch_chars:
+            timeout = deadline - time.monotonic()
+
+            if not self._buffer and timeout <= 0:
+                break
+
+            try:
+                queued = await self._get(max(timeout, 0))
+            except asyncio.TimeoutError:
+                break
+
+            payload = self._take_payload(queued)
+            payloads.append(payload)
+            chars += len(payload["text"])
+
+        return payloads
+
+    @classmethod
+    def pack(cls, payloads: List[LogPayload]) -> List[List[LogPayload]]:
+        """Packs payloads into as few messages as Discord's limits allow."""
+        messages: List[List[LogPayload]] = []
+        current: List[LogPayload] = []
+        embeds = files = chars = 0
+
+        for payload in payloads:
+            if cls.is_file(payload):
+                if files >= MAX_FILES:
+                    messages.append(current)
+                    current, embeds, files, chars = [], 0, 0, 0
+                files += 1
+            else:
+                size = len(payload["text"])
+                if embeds >= MAX_EMBEDS or chars + size > MAX_MESSAGE_CHARS:
+                    messages.append(current)
+                    current, embeds, files, chars = [], 0, 0, 0
+                embeds += 1
+                chars += size
+
+            current.append(payload)
+
+        if current:
+            messages.append(current)
+
+        return messages
+
+    async def deliver(self, payloads: List[LogPayload]) -> bool:
+        """Sends one message, retrying with exponential backoff and spooling it on failure.
+
+        Returns:
+            bool: Whether the message was delivered.
+        """
+        delay = self.retry_backoff
+
+        for attempt in range(self.max_retries):
+            if self.limiter is not None:
+                await self.limiter.acquire()
+
+            embeds, files = self.build_message(payloads)
+
+            try:
+                await self.hook.send(embeds=embeds, files=files)
+            except discord.HTTPException as exc:
+                if 400 <= exc.status < 500 and exc.status != 429:
+                    # retrying or replaying a bad request would never succeed.
+                    self.stats.failures += len(payloads)
+                    self.logger.error(
+                        "webhook rejected %d records",
+                        len(payloads),
+                        exc_info=exc,
+                        extra={"webhook": False},
+                    )
+                    return False
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            else:
+                self.stats.messages += 1
+                self.stats.sent += len(payloads)
+                return True
+
+            if attempt + 1 < self.max_retries:
+                self.stats.retries += 1
+                await asyncio.sleep(delay * random.uniform(1, 1.5))
+                delay = min(delay * 2, self.max_retry_backoff)
+
+        await self.spool(payloads)
+        return False
+
+    def _append_spool(self, payloads: List[LogPayload]) -> bool:
+        assert self.spool_path is not None
+
+        try:
+            size = os.path.getsize(self.spool_path)
+        except OSError:
+            size = 0
+
+        lines = "".join(json.dumps(p) + "\n" for p in payloads)
+
+        if size + len(lines) > self.max_spool_bytes:
+            return False
+
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+        return True
+
+    async def spool(self, payloads: List[LogPayload]) -> None:
+        """Appends undeliverable payloads to the spool file."""
+        if self.spool_path is None:
+            self.stats.failures += len(payloads)
+            return
+
+        try:
+            spooled = await self.loop.run_in_executor(
+                None, self._append_spool, payloads
+            )
+        except OSError:
+            spooled = False
+
+        if spooled:
+            self.stats.spooled += len(payloads)
+        else:
+            self.stats.failures += len(payloads)
+
+        self.logger.error(
+            "failed to deliver %d records to the webhook, %s",
+            len(payloads),
+            "spooled them to disk" if spooled else "dropped them",
+            extra={"webhook": False},
+        )
+
+    def _read_spool(self, path: str) -> List[LogPayload]:
+        payloads = []
+
+        # a crash while appending can leave a torn last line, which is skipped.
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    payload = None
+
+                if isinstance(payload, dict) and all(
+                    key in payload for key in LogPayload.__annotations__
+                ):
+                    payloads.append(payload)
                 else:
-                    embed = Embed(
-                        description=discord.utils.escape_markdown(formatted),
-                        color=self.COLORS[record.levelno],
+                    self.logger.warning(
+                        "skipping unreadable line %d of %s",
+                        number,
+                        path,
+                        extra={"webhook": False},
                     )
-                    embeds.append(embed)
 
-            if embeds or files:
+        return payloads
+
+    @property
+    def replay_path(self) -> str:
+        assert self.spool_path is not None
+        return f"{self.spool_path}.replay"
+
+    def _take_spool(self) -> List[LogPayload]:
+        assert self.spool_path is not None
+
+        if not os.path.exists(self.replay_path):
+            try:
+                # renamed first so anything spooled while replaying isn't read twice.
+                os.replace(self.spool_path, self.replay_path)
+            except FileNotFoundError:
+                return []
+        elif os.path.exists(self.spool_path):
+            # an earlier replay was interrupted, so the spool is added to what it had left.
+            with open(self.spool_path, "rb") as spool, open(
+                self.replay_path, "ab+"
+            ) as replay:
+                replay.seek(0, os.SEEK_END)
+
+                if replay.tell():
+                    replay.seek(-1, os.SEEK_END)
+
+                    # a torn last line mustn't swallow the first spooled one.
+                    if replay.read(1) != b"\n":
+                        replay.write(b"\n")
+
+                replay.write(spool.read())
+
+            os.remove(self.spool_path)
+
+        return self._read_spool(self.replay_path)
+
+    def _finish_replay(self) -> None:
+        try:
+            os.remove(self.replay_path)
+        except FileNotFoundError:
+            pass
+
+    async def replay_spool(self) -> None:
+        """Sends everything left in the spool from earlier failures.
+
+        The replayed file is only removed once every message in it was delivered or spooled
+        again, so an interrupted replay starts over, possibly sending some records twice.
+        """
+        if self.spool_path is None:
+            return
+
+        payloads = await self.loop.run_in_executor(None, self._take_spool)
+
+        for message in self.pack(payloads):
+            if await self.deliver(message):
+                self.stats.replayed += len(message)
+
+        await self.loop.run_in_executor(None, self._finish_replay)
+
+    async def sender(self) -> None:
+        await self.replay_spool()
+
+        while True:
+            self._outgoing = self.pack(await self.collect())
+            self._collecting = []
+
+            while self._outgoing:
+                await self.deliver(self._outgoing[0])
+                del self._outgoing[0]
+
+    async def shutdown(self, timeout: float = 5) -> None:
+        """Stops the sender, then sends what's left of the backlog, spooling anything that
+        isn't sent within ``timeout`` seconds. Must be called while the webhook's session is open.
+        """
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        # records still being formatted are handed over before the listener stops.
+        self._inbox.put_nowait(None)
+        await self.loop.run_in_executor(None, self._listener.join, timeout)
+        await asyncio.sleep(0)
+
+        payloads = [payload for message in self._outgoing for payload in message]
+        payloads.extend(self._collecting)
+
+        while self._buffer:
+            entry = self._buffer.popleft()
+            entry.queued = False
+            payloads.append(self._take_payload(entry))
+
+        messages = self.pack(payloads)
+        self._collecting, self._outgoing = [], []
+
+        async def send_all() -> None:
+            while messages:
+                if self.limiter is not None:
+                    await self.limiter.acquire()
+
+                embeds, files = self.build_message(messages[0])
                 await self.hook.send(embeds=embeds, files=files)
+                self.stats.messages += 1
+                self.stats.sent += len(messages.pop(0))
+
+        try:
+            await asyncio.wait_for(send_all(), timeout)
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+        if messages:
+            await self.spool([payload for message in messages for payload in message])
+
+    async def supervise(self) -> None:
+        """Runs :meth:`sender`, restarting it if it crashes."""
+        delay = self.retry_backoff
+
+        while True:
+            try:
+                await self.sender()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.restarts += 1
+                self.logger.exception(
+                    "webhook logger sender crashed, restarting in %.0fs",
+                    delay,
+                    extra={"webhook": False},
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_backoff)
+
+    async def reporter(self) -> None:
+        """Periodically closes collapse windows and reports what was dropped or collapsed."""
+        dropped = collapsed = 0
+
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+
+            for key, window in list(self._windows.items()):
+                if now - window.start < self.collapse_window:
+                    continue
+
+                del self._windows[key]
+
+                if window.suppressed:
+                    self._push(QueuedRecord(window.last, window.suppressed))
+
+            if self.stats.dropped > dropped or self.stats.collapsed > collapsed:
+                self.logger.warning(
+                    "webhook logger dropped %d and collapsed %d records in the last %.0fs",
+                    self.stats.dropped - dropped,
+                    self.stats.collapsed - collapsed,
+                    self.report_interval,
+                )
+                dropped, collapsed = self.stats.dropped, self.stats.collapsed
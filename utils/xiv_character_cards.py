@@ -1,11 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import math
+import time
 from typing import TYPE_CHECKING, TypedDict
 
 import aiohttp
 
+from .cache import TTLCache
+from .metrics import RollingHistogram
+from .resilience import CircuitBreaker, HedgeStats, hedged
+
 if TYPE_CHECKING:
-    from typing import Optional, Dict, Literal
+    from typing import (
+        Any,
+        AsyncIterator,
+        Awaitable,
+        Callable,
+        Optional,
+        Dict,
+        Hashable,
+        Iterable,
+        Literal,
+        Tuple,
+        TypeVar,
+        Union,
+    )
+
+    from .persistent_cache import PersistentCache
+    from .ratelimit import TokenBucket
+
+    CacheKey = Union[Tuple[str, int], Tuple[str, str, str]]
+    T = TypeVar("T")
 
 __all__ = (
     "XIVCharacterCardsClient",
@@ -41,23 +67,275 @@ class Response(TypedDict):
     url: str
 
 
+DEFAULT_TIMEOUTS: Dict[str, float] = {"prepare": 30, "download": 15}
+
+
 class XIVCharacterCardsClient:
     BASE_URL: str = "https://ffxiv-character-cards.herokuapp.com"
 
-    def __init__(self, session: Optional[aiohttp.ClientSession] = None) -> None:
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        *,
+        cache_ttl: float = 3600,
+        cache_size: int = 512,
+        cache_stale_ttl: float = 0,
+        store: Optional[PersistentCache] = None,
+        limiter: Optional[TokenBucket] = None,
+        max_concurrency: int = 4,
+        timeouts: Optional[Dict[str, float]] = None,
+        hedge: bool = False,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
         """Creates a new client.
 
         Args:
             session (Optional[aiohttp.ClientSession], optional): The aiohttp clientsession to use. This will create one
                 if none is given. Defaults to None.
+            cache_ttl (float, optional): How long a prepared card is cached for, in seconds. Defaults to 3600.
+            cache_size (int, optional): The maximum amount of cached cards. Defaults to 512.
+            cache_stale_ttl (float, optional): How long an expired card is still served while it's
+                refreshed in the background, in seconds. Defaults to 0.
+            store (Optional[PersistentCache], optional): An on-disk store to keep cards in across restarts.
+                Defaults to None.
+            limiter (Optional[TokenBucket], optional): The rate limiter every request goes through. Defaults to None.
+            max_concurrency (int, optional): How many requests can be in flight at once. Defaults to 4.
+            timeouts (Optional[Dict[str, float]], optional): The timeout of each endpoint ("prepare" and
+                "download"), in seconds. Defaults to 30 and 15.
+            hedge (bool, optional): Whether to send a second request when the first takes longer than the
+                endpoint's p95 latency. Defaults to False.
+            failure_threshold (int, optional): How many failures in a row open the circuit breaker. Defaults to 5.
+            reset_timeout (float, optional): How long the circuit breaker stays open, in seconds. Defaults to 30.
         """
         self._session = session or aiohttp.ClientSession()
+        self.limiter = limiter
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(
+            "card api", failure_threshold=failure_threshold, reset_timeout=reset_timeout
+        )
+        self.latency = {endpoint: RollingHistogram() for endpoint in self.timeouts}
+        self.hedges = {endpoint: HedgeStats() for endpoint in self.timeouts}
+        self.cache: TTLCache[CacheKey, Response] = TTLCache(
+            ttl=cache_ttl,
+            maxsize=cache_size,
+            store=store,
+            namespace="cards",
+            stale_ttl=cache_stale_ttl,
+        )
+
+    @property
+    def idle(self) -> bool:
+        """Whether no requests are running or waiting on the rate limiter."""
+        if self.limiter is not None and self.limiter.waiting:
+            return False
+        return not self.cache.inflight
+
+    @staticmethod
+    def _name_key(world: str, name: str) -> CacheKey:
+        return ("name", world.casefold(), " ".join(name.split()).casefold())
+
+    async def _acquire(self, key: Hashable) -> None:
+        if self.limiter is not None:
+            await self.limiter.acquire(key)
+
+    def _check_ratelimited(self, res: aiohttp.ClientResponse) -> None:
+        if res.status != 429:
+            return
+
+        try:
+            retry_after = float(res.headers.get("Retry-After", 1))
+        except ValueError:
+            retry_after = 1
+
+        if self.limiter is not None:
+            self.limiter.defer(retry_after)
+
+        raise ApiError(f"Ratelimited, try again in {retry_after:.0f} seconds.")
+
+    async def prepare_id(self, id: int, *, key: Hashable = None) -> Response:
+        """Gets the character card for a lodestone id, using the cache if possible.
+
+        Concurrent calls for the same id share one request.
+
+        Args:
+            id (int): The lodestone id.
+            key (Hashable, optional): What to queue fairly by in the rate limiter, usually a guild id.
+
+        Raises:
+            ApiError: A generic error occured with the api.
+
+        Returns:
+            Response: The response of the request.
+        """
+        return await self.cache.get_or_fetch(
+            ("id", id), lambda: self._prepare_id(id, key)
+        )
+
+    async def prepare_name(
+        self, world: str, name: str, *, key: Hashable = None
+    ) -> Response:
+        """Gets the character card for a name & world, using the cache if possible.
+
+        Concurrent calls for the same character share one request.
+
+        Args:
+            world (str): The world
+            name (str): The character's name
+            key (Hashable, optional): What to queue fairly by in the rate limiter, usually a guild id.
+
+        Raises:
+            ApiError: A generic error occured with the api.
 
-    async def prepare_id(self, id: int) -> Response:
+        Returns:
+            Response: The response of the request.
+        """
+        return await self.cache.get_or_fetch(
+            self._name_key(world, name), lambda: self._prepare_name(world, name, key)
+        )
+
+    async def refresh_id(self, id: int, *, key: Hashable = None) -> Response:
+        """Prepares the card of a lodestone id again, even if it's cached."""
+        return await self.cache.refresh(("id", id), lambda: self._prepare_id(id, key))
+
+    async def warm_id(
+        self, id: int, *, margin: float = 0, key: Hashable = None
+    ) -> None:
+        """Makes sure the card of a lodestone id stays cached for at least ``margin`` more seconds."""
+        if ("id", id) not in self.cache:
+            await self.prepare_id(id, key=key)
+        elif self.cache.expires_in(("id", id)) < margin:
+            await self.refresh_id(id, key=key)
+
+    def prepare_ids(
+        self, ids: Iterable[int], *, key: Hashable = None
+    ) -> AsyncIterator[Tuple[int, Union[Response, CardApiError]]]:
+        """Gets the character cards of many lodestone ids, yielding each one as soon as it's ready.
+
+        Duplicate ids are only requested once. Failures are yielded in place of the card.
+
+        Args:
+            ids (Iterable[int]): The lodestone ids.
+            key (Hashable, optional): What to queue fairly by in the rate limiter, usually a guild id.
+        """
+        calls = {
+            ("id", id): (id, lambda id=id: self.prepare_id(id, key=key)) for id in ids
+        }
+        return self._as_completed(calls.values())
+
+    def prepare_names(
+        self, world: str, names: Iterable[str], *, key: Hashable = None
+    ) -> AsyncIterator[Tuple[str, Union[Response, CardApiError]]]:
+        """Same as :meth:`prepare_ids`, but for the names of characters on ``world``."""
+        calls = {
+            self._name_key(world, name): (
+                name,
+                lambda name=name: self.prepare_name(world, name, key=key),
+            )
+            for name in names
+        }
+        return self._as_completed(calls.values())
+
+    async def _as_completed(
+        self, calls: Iterable[Tuple[Any, Callable[[], Awaitable[Response]]]]
+    ) -> AsyncIterator[Tuple[Any, Union[Response, CardApiError]]]:
+        async def run(label: Any, call: Callable[[], Awaitable[Response]]):
+            try:
+                return label, await call()
+            except CardApiError as e:
+                return label, e
+            except aiohttp.ClientError as e:
+                return label, ApiError(str(e) or type(e).__name__)
+
+        tasks = [asyncio.ensure_future(run(label, call)) for label, call in calls]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # requests already made still finish into the cache.
+            for task in tasks:
+                task.cancel()
+
+    async def _get(
+        self,
+        endpoint: str,
+        url: str,
+        key: Hashable,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+    ) -> T:
+        """Makes a GET request through the circuit breaker, hedging it if enabled.
+
+        Raises:
+            ApiError: The circuit is open, or the api didn't answer in time.
+        """
+        if not self.breaker.allow():
+            raise ApiError(
+                "The card api is having issues, "
+                f"try again in {math.ceil(self.breaker.retry_after)} seconds."
+            )
+
+        def attempt() -> Awaitable[T]:
+            return self._attempt(endpoint, url, key, read)
+
+        latency = self.latency[endpoint].snapshot()
+
+        try:
+            # the p95 is meaningless until there's enough samples.
+            if self.hedge and latency.count >= 20:
+                return await hedged(
+                    attempt, latency.percentile(95) / 1e9, self.hedges[endpoint]
+                )
+
+            return await attempt()
+        except asyncio.TimeoutError:
+            raise ApiError("The card api took too long to respond.") from None
+
+    async def _attempt(
+        self,
+        endpoint: str,
+        url: str,
+        key: Hashable,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+    ) -> T:
+        # only the total is per endpoint, the rest comes from the session's pool.
+        defaults = self._session.timeout
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeouts[endpoint],
+            connect=defaults.connect,
+            sock_read=defaults.sock_read,
+            sock_connect=defaults.sock_connect,
+        )
+
+        async with self._concurrency:
+            await self._acquire(key)
+            start = time.perf_counter_ns()
+            # None while the outcome says nothing about the api's health, e.g. when ratelimited.
+            healthy: Optional[bool] = None
+
+            try:
+                async with self._session.get(url, timeout=timeout) as res:
+                    self._check_ratelimited(res)
+                    healthy = res.status < 500
+                    result = await read(res)
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                healthy = False
+                raise
+            finally:
+                if healthy is not None:
+                    self.breaker.record(healthy)
+
+        self.latency[endpoint].record(time.perf_counter_ns() - start)
+        return result
+
+    async def _prepare_id(self, id: int, key: Hashable = None) -> Response:
         """Makes a request to the /prepare/id endpoint to get the character card.
 
         Args:
             id (int): The lodestone id.
+            key (Hashable, optional): What to queue fairly by in the rate limiter.
 
         Raises:
             ApiError: A generic error occured with the api.
@@ -65,32 +343,59 @@ class XIVCharacterCardsClient:
         Returns:
             Response: The response of the request.
         """
-        url = f"{self.BASE_URL}/prepare/{id}"
 
-        async with self._session.get(url) as res:
+        async def read(res: aiohttp.ClientResponse) -> Response:
             json = await res.json()
 
-        if res.status == 400:
-            raise CharacterNotFound(await res.text())
+            if res.status == 400:
+                raise CharacterNotFound(await res.text())
 
-        if res.status == 500 or json.get("status") == "error":
-            raise ApiError(json["reason"])
+            if res.status == 500 or json.get("status") == "error":
+                raise ApiError(json["reason"])
 
-        return Response(status=json["status"], url=self.BASE_URL + json["url"])
+            return Response(status=json["status"], url=self.BASE_URL + json["url"])
 
-    async def prepare_name(self, world: str, name: str) -> Response:
-        url = f"{self.BASE_URL}/prepare/name/{world}/{name}"
+        return await self._get("prepare", f"{self.BASE_URL}/prepare/{id}", key, read)
 
-        async with self._session.get(url) as res:
+    async def _prepare_name(
+        self, world: str, name: str, key: Hashable = None
+    ) -> Response:
+        async def read(res: aiohttp.ClientResponse) -> Response:
             # this can return json *or* text for some reason. only on /name/world endpoints though.
             if res.status == 404:
                 raise CharacterNotFound(await res.text())
+
             json = await res.json()
 
-        if json.get("status") == "error":
-            raise ApiError(json["reason"])
+            if json.get("status") == "error":
+                raise ApiError(json["reason"])
+
+            return Response(status=json["status"], url=self.BASE_URL + json["url"])
+
+        url = f"{self.BASE_URL}/prepare/name/{world}/{name}"
+        return await self._get("prepare", url, key, read)
+
+    async def download(self, url: str, *, key: Hashable = None) -> bytes:
+        """Downloads a prepared card.
+
+        Args:
+            url (str): The url of the card, from a :class:`Response`.
+            key (Hashable, optional): What to queue fairly by in the rate limiter, usually a guild id.
+
+        Raises:
+            ApiError: The card couldn't be downloaded.
+
+        Returns:
+            bytes: The PNG image.
+        """
+
+        async def read(res: aiohttp.ClientResponse) -> bytes:
+            if res.status != 200:
+                raise ApiError(f"Downloading the card failed ({res.status}).")
+
+            return await res.read()
 
-        return Response(status=json["status"], url=self.BASE_URL + json["url"])
+        return await self._get("download", url, key, read)
 
     async def get_id(self, id: int) -> str:
         """Return a link to the character card (if cached).